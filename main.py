@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+import os
 import sys
 
 
@@ -21,13 +22,19 @@ def _ensure_project_on_path() -> None:
         sys.path.insert(0, str(project_root))
 
 def main() -> None:
-    """Launch the GUI application."""
+    """Launch the GUI application.
+
+    The storage location defaults to ``accounts_data.json`` in the current
+    directory.  It can be overridden with the first command-line argument or
+    the ``MULTI_ACCOUNTS_STORAGE`` environment variable, using either a path
+    or a backend URL such as ``sqlite://accounts.db``.
+    """
 
     _ensure_project_on_path()
     from multi_accounts_manager.app import run_app
 
-    storage_path = Path.cwd() / "accounts_data.json"
-    run_app(storage_path)
+    storage = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("MULTI_ACCOUNTS_STORAGE")
+    run_app(storage or Path.cwd() / "accounts_data.json")
 
 
 if __name__ == "__main__":
@@ -2,27 +2,42 @@
 
 from __future__ import annotations
 
+import logging
+import time
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Set, Tuple
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import QStringListModel, Qt, QTimer
+from PyQt6.QtGui import QPaintEvent
 from PyQt6.QtWidgets import (
     QApplication,
+    QCompleter,
     QHBoxLayout,
     QLabel,
+    QLineEdit,
     QMainWindow,
     QMessageBox,
+    QProgressBar,
     QPushButton,
     QDialog,
-    QTableWidget,
-    QTableWidgetItem,
+    QHeaderView,
+    QStackedLayout,
+    QTableView,
     QTabWidget,
     QVBoxLayout,
     QWidget,
 )
 
-from .data_store import Account, DataStore
+from .backends import StorageBackend
+from .data_store import Account, DuplicateAccountError
 from .dialogs import AccountDialog, PasswordChangeDialog
+from .loader import StoreLoader
+from .locking import WriteConflictError
+from .models import AccountTableModel
+from .search import PrefixIndex, TrigramIndex
+from .signals import StoreSignals
+
+logger = logging.getLogger(__name__)
 
 SERVICES: List[str] = [
     "Facebook",
@@ -38,21 +53,47 @@ SERVICES: List[str] = [
 
 
 class ServiceTab(QWidget):
-    """Widget that manages accounts for a specific service."""
+    """Widget that manages accounts for a specific service.
+
+    The table follows the store's change events one row at a time, so an
+    edit costs the same however many accounts the service has, and the
+    selection and scroll position stay where they were.  When the whole
+    service is replaced the selected account and the account at the top of
+    the view are looked up again by id.
+    """
 
-    def __init__(self, service_name: str, store: DataStore, parent: QWidget | None = None) -> None:
+    def __init__(
+        self,
+        service_name: str,
+        store: StorageBackend,
+        signals: StoreSignals,
+        parent: QWidget | None = None,
+    ) -> None:
         super().__init__(parent)
         self._service_name = service_name
         self._store = store
+        self._model = AccountTableModel(service_name, store, signals, self)
 
-        self._table = QTableWidget(self)
-        self._table.setColumnCount(2)
-        self._table.setHorizontalHeaderLabels(["Username / Email", "Password"])
+        self._table = QTableView(self)
+        self._table.setModel(self._model)
         self._table.horizontalHeader().setStretchLastSection(True)
-        self._table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self._table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self._table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self._table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self._table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self._table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         self._table.verticalHeader().setVisible(False)
+        # Fixed row heights spare the view from measuring every row of a large service.
+        self._table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        for model_signal in (self._model.rowsInserted, self._model.rowsRemoved, self._model.modelReset):
+            model_signal.connect(self._update_status)
+        self._kept_selection: str | None = None
+        self._kept_top: str | None = None
+        self._top_row = -1
+        self._model.modelAboutToBeReset.connect(self._remember_position)
+        self._model.modelReset.connect(self._restore_position)
+        self._model.rowsAboutToBeInserted.connect(self._remember_top_row)
+        self._model.rowsAboutToBeRemoved.connect(self._remember_top_row)
+        self._model.rowsInserted.connect(lambda _, first, last: self._shift_top_row(first, last - first + 1))
+        self._model.rowsRemoved.connect(lambda _, first, last: self._shift_top_row(first, first - last - 1))
 
         self._status_label = QLabel(self)
         self._status_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
@@ -76,18 +117,53 @@ class ServiceTab(QWidget):
         layout.addWidget(self._table)
         layout.addWidget(self._status_label)
 
-        self.refresh()
+        self._update_status()
+
+    @property
+    def model(self) -> AccountTableModel:
+        return self._model
 
     def refresh(self) -> None:
-        accounts = self._store.list_accounts(self._service_name)
-        self._table.setRowCount(len(accounts))
-        for row, account in enumerate(accounts):
-            username_item = QTableWidgetItem(account.username)
-            password_item = QTableWidgetItem(self._mask_password(account.password))
-            username_item.setData(Qt.ItemDataRole.UserRole, account)
-            self._table.setItem(row, 0, username_item)
-            self._table.setItem(row, 1, password_item)
-        self._status_label.setText(f"{len(accounts)} account(s) saved")
+        """Re-read the service unless the table already shows its current generation."""
+
+        self._model.refresh()
+
+    def _update_status(self) -> None:
+        self._status_label.setText(f"{self._model.rowCount()} account(s) saved")
+
+    def select_account(self, account_id: str) -> bool:
+        row = self._model.row_of(account_id)
+        if row < 0:
+            return False
+        self._select_row(row)
+        return True
+
+    def _select_row(self, row: int) -> None:
+        self._table.selectRow(row)
+        self._table.scrollTo(self._model.index(row, 0))
+
+    def _remember_position(self) -> None:
+        selected = self._model.account_at(self._selected_row())
+        top = self._model.account_at(self._table.rowAt(0))
+        self._kept_selection = selected.id if selected is not None else None
+        self._kept_top = top.id if top is not None else None
+
+    def _remember_top_row(self) -> None:
+        self._top_row = self._table.rowAt(0)
+
+    def _shift_top_row(self, first: int, delta: int) -> None:
+        # Rows inserted or removed above the viewport would otherwise scroll
+        # the accounts the user is looking at.
+        if 0 <= self._top_row and first < self._top_row:
+            top = max(first, self._top_row + delta)
+            self._table.scrollTo(self._model.index(top, 0), QTableView.ScrollHint.PositionAtTop)
+
+    def _restore_position(self) -> None:
+        if self._kept_top is not None and (row := self._model.row_of(self._kept_top)) >= 0:
+            self._table.scrollTo(self._model.index(row, 0), QTableView.ScrollHint.PositionAtTop)
+        if self._kept_selection is not None and (row := self._model.row_of(self._kept_selection)) >= 0:
+            self._table.selectRow(row)
+        self._kept_selection = self._kept_top = None
 
     def _selected_row(self) -> int:
         selection = self._table.selectionModel()
@@ -99,64 +175,63 @@ class ServiceTab(QWidget):
         return indexes[0].row()
 
     def _selected_account(self) -> Account | None:
-        row = self._selected_row()
-        if row < 0:
-            return None
-        item = self._table.item(row, 0)
-        if not item:
+        shown = self._model.account_at(self._selected_row())
+        if shown is None:
             return None
-        account = item.data(Qt.ItemDataRole.UserRole)
-        if isinstance(account, Account):
-            return account
-        return None
+        return self._store.get_account(shown.id)
 
     def _handle_add_account(self) -> None:
         dialog = AccountDialog(self, title=f"Add {self._service_name} Account")
         if dialog.exec() == int(QDialog.DialogCode.Accepted):
             payload = dialog.payload()
-            self._store.add_account(
-                self._service_name,
-                Account(username=payload.username, password=payload.password),
-            )
-            self.refresh()
+            account = Account(username=payload.username, password=payload.password)
+            try:
+                self._store.add_account(self._service_name, account)
+            except DuplicateAccountError as exc:
+                QMessageBox.warning(self, "Add Account", str(exc))
+                return
+            # New accounts are appended, so this avoids searching for the row.
+            last = self._model.rowCount() - 1
+            shown = self._model.account_at(last)
+            if shown is not None and shown.id == account.id:
+                self._select_row(last)
 
     def _handle_edit_account(self) -> None:
-        row = self._selected_row()
-        if row < 0:
+        account = self._selected_account()
+        if account is None:
             QMessageBox.information(self, "Edit Account", "Select an account to edit")
             return
-        account = self._store.list_accounts(self._service_name)[row]
         dialog = AccountDialog(self, title=f"Edit {self._service_name} Account")
         dialog.set_initial_data(account.username, account.password)
         if dialog.exec() == int(QDialog.DialogCode.Accepted):
             payload = dialog.payload()
-            self._store.update_account(
-                self._service_name,
-                row,
-                Account(username=payload.username, password=payload.password),
-            )
-            self.refresh()
+            try:
+                self._store.update_account_by_id(
+                    account.id,
+                    Account(username=payload.username, password=payload.password),
+                )
+            except DuplicateAccountError as exc:
+                QMessageBox.warning(self, "Edit Account", str(exc))
 
     def _handle_change_password(self) -> None:
-        row = self._selected_row()
-        if row < 0:
+        account = self._selected_account()
+        if account is None:
             QMessageBox.information(self, "Change Password", "Select an account first")
             return
-        accounts = self._store.list_accounts(self._service_name)
-        account = accounts[row]
         dialog = PasswordChangeDialog(self)
         if dialog.exec() == int(QDialog.DialogCode.Accepted):
             new_password = dialog.password()
-            self._store.update_account(
-                self._service_name,
-                row,
-                Account(username=account.username, password=new_password),
-            )
-            self.refresh()
+            try:
+                self._store.update_account_by_id(
+                    account.id,
+                    Account(username=account.username, password=new_password),
+                )
+            except DuplicateAccountError as exc:
+                QMessageBox.warning(self, "Change Password", str(exc))
 
     def _handle_delete_account(self) -> None:
-        row = self._selected_row()
-        if row < 0:
+        account = self._selected_account()
+        if account is None:
             QMessageBox.information(self, "Delete Account", "Select an account to delete")
             return
         confirmation = QMessageBox.question(
@@ -167,34 +242,263 @@ class ServiceTab(QWidget):
             QMessageBox.StandardButton.No,
         )
         if confirmation == QMessageBox.StandardButton.Yes:
-            self._store.delete_account(self._service_name, row)
-            self.refresh()
+            row = self._selected_row()
+            self._store.delete_account_by_id(account.id)
+            # Keep a selection for the next action: the account that moved up.
+            if self._selected_row() < 0 and self._model.rowCount():
+                self._select_row(min(row, self._model.rowCount() - 1))
 
-    @staticmethod
-    def _mask_password(password: str) -> str:
-        if not password:
-            return ""
-        return "•" * len(password)
+
+class _ServicePage(QWidget):
+    """Tab page that shows a loading indicator until its :class:`ServiceTab` is set."""
+
+    def __init__(self, service_name: str, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        placeholder = QWidget(self)
+        busy = QProgressBar(placeholder)
+        busy.setRange(0, 0)
+        busy.setMaximumWidth(240)
+        label = QLabel(f"Loading {service_name} accounts…", placeholder)
+        placeholder_layout = QVBoxLayout(placeholder)
+        placeholder_layout.addStretch(1)
+        placeholder_layout.addWidget(label, 0, Qt.AlignmentFlag.AlignHCenter)
+        placeholder_layout.addWidget(busy, 0, Qt.AlignmentFlag.AlignHCenter)
+        placeholder_layout.addStretch(1)
+        self._layout = QStackedLayout(self)
+        self._layout.addWidget(placeholder)
+
+    def set_tab(self, tab: ServiceTab) -> None:
+        self._layout.addWidget(tab)
+        self._layout.setCurrentWidget(tab)
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, store: DataStore, parent: QWidget | None = None) -> None:
+    """Main window; shows ``store`` right away, or the store :meth:`load` opens.
+
+    Without a store the window starts with a loading indicator on every tab.
+    :meth:`load` opens the store on a background thread and loads the
+    services one by one, current tab first; the search box is enabled once
+    the search indexes have been built.  A tab's :class:`ServiceTab` is only
+    built, and its service only read, when the tab is first shown.  With
+    ``prefetch`` the tabs next to the current one are also built, one at a
+    time, whenever the event loop has nothing else to do.
+    :attr:`startup_timings` records how long the first paint and each stage
+    of loading took.
+    """
+
+    SEARCH_LIMIT = 50
+
+    def __init__(
+        self, store: StorageBackend | None = None, parent: QWidget | None = None, *, prefetch: bool = True
+    ) -> None:
         super().__init__(parent)
-        self._store = store
+        self._started = time.perf_counter()
+        self.startup_timings: Dict[str, float] = {}
+        self._store: StorageBackend | None = None
+        self._signals: StoreSignals | None = None
+        self._loader: StoreLoader | None = None
         self.setWindowTitle("Multi Accounts Manager")
         self.resize(900, 600)
 
+        self._prefix_index = PrefixIndex()
+        self._fuzzy_index = TrigramIndex()
+        self._search_matches: Dict[str, Tuple[str, str]] = {}
+        self._search_model = QStringListModel(self)
+        completer = QCompleter(self._search_model, self)
+        # Fuzzy matches do not share the typed prefix, so show the list as built.
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        completer.activated.connect(self._handle_search_activated)
+        self._search_box = QLineEdit(self)
+        self._search_box.setPlaceholderText("Search accounts in all services…")
+        self._search_box.setCompleter(completer)
+        self._search_box.textEdited.connect(self._handle_search_edited)
+        self._search_box.setEnabled(False)
+
         self._tabs = QTabWidget(self)
+        self._tabs.currentChanged.connect(self._handle_tab_changed)
+        self._pages: Dict[str, _ServicePage] = {}
+        self._service_tabs: Dict[str, ServiceTab] = {}
+        self._loaded: Set[str] = set()
+        self._prefetch = prefetch
+        # A zero-interval timer fires once the queued events have been handled.
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(0)
+        self._prefetch_timer.timeout.connect(self._prefetch_next)
         for service in SERVICES:
-            tab = ServiceTab(service, self._store, self)
-            self._tabs.addTab(tab, service)
+            page = _ServicePage(service, self)
+            self._pages[service] = page
+            self._tabs.addTab(page, service)
+
+        self._progress = QProgressBar(self)
+        self._progress.setRange(0, len(SERVICES))
+        self._progress.setMaximumWidth(200)
+        self._progress.setFormat("Loading %v/%m services")
+        self.statusBar().addPermanentWidget(self._progress)
+
+        central = QWidget(self)
+        layout = QVBoxLayout(central)
+        layout.addWidget(self._search_box)
+        layout.addWidget(self._tabs)
+        self.setCentralWidget(central)
+
+        if store is not None:
+            self._handle_opened(store)
+            for service in SERVICES:
+                self._handle_service_ready(service)
+            store.attach_index(self._prefix_index)
+            store.attach_index(self._fuzzy_index)
+            self._handle_indexed()
+
+    @property
+    def store(self) -> StorageBackend | None:
+        return self._store
+
+    def load(self, location: str | Path | None, started: float | None = None) -> None:
+        """Open the store at ``location`` in the background and fill the tabs from it.
+
+        ``started`` is the :func:`time.perf_counter` value that
+        :attr:`startup_timings` are measured from; by default, when the
+        window was created.
+        """
+
+        if started is not None:
+            self._started = started
+        current = self._tabs.tabText(self._tabs.currentIndex())
+        services = sorted(SERVICES, key=lambda service: service != current)
+        self._loader = StoreLoader(location, services, [self._prefix_index, self._fuzzy_index], self)
+        self._loader.opened.connect(self._handle_opened)
+        self._loader.service_ready.connect(self._handle_service_ready)
+        self._loader.indexed.connect(self._handle_indexed)
+        self._loader.failed.connect(self._handle_load_failed)
+        self._loader.start()
+
+    def close_store(self) -> None:
+        """Wait for a pending load to finish, then close the store."""
+
+        if self._loader is not None:
+            self._loader.wait()
+            self._loader = None
+        if self._store is not None:
+            self._store.close()
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        super().paintEvent(event)
+        self._mark("first_paint")
+
+    def _mark(self, stage: str) -> None:
+        if stage not in self.startup_timings:
+            self.startup_timings[stage] = (time.perf_counter() - self._started) * 1000
+
+    def _handle_opened(self, store: StorageBackend) -> None:
+        self._mark("store_opened")
+        self._store = store
+        self._signals = StoreSignals(store, self)
+        self._signals.conflicted.connect(self._handle_conflict)
+
+    def _handle_service_ready(self, service: str) -> None:
+        self._loaded.add(service)
+        self._progress.setValue(len(self._loaded))
+        if service == self._current_service():
+            self._service_tab(service)
+        self._schedule_prefetch()
+
+    def _current_service(self) -> str:
+        return self._tabs.tabText(self._tabs.currentIndex())
+
+    def _service_tab(self, service: str) -> ServiceTab | None:
+        """The tab showing ``service``, built now if need be; ``None`` until the service is loaded."""
+
+        tab = self._service_tabs.get(service)
+        if tab is None and service in self._loaded:
+            assert self._store is not None and self._signals is not None
+            page = self._pages[service]
+            tab = ServiceTab(service, self._store, self._signals, page)
+            self._service_tabs[service] = tab
+            page.set_tab(tab)
+            if service == self._current_service():
+                self._mark("current_tab_ready")
+        return tab
+
+    def _neighbours_to_prefetch(self) -> List[str]:
+        current = self._tabs.currentIndex()
+        neighbours = (self._tabs.tabText(index) for index in (current + 1, current - 1) if 0 <= index < len(SERVICES))
+        return [service for service in neighbours if service in self._loaded and service not in self._service_tabs]
+
+    def _schedule_prefetch(self) -> None:
+        if self._prefetch and self._neighbours_to_prefetch():
+            self._prefetch_timer.start()
+
+    def _prefetch_next(self) -> None:
+        # One tab per timeout, so input arriving meanwhile is handled in between.
+        pending = self._neighbours_to_prefetch()
+        if pending:
+            self._service_tab(pending[0])
+            self._schedule_prefetch()
+
+    def _handle_indexed(self) -> None:
+        self._mark("services_ready")
+        self._search_box.setEnabled(True)
+        self.statusBar().removeWidget(self._progress)
+        logger.info(
+            "Startup: %s", ", ".join(f"{stage} {elapsed:.0f} ms" for stage, elapsed in self.startup_timings.items())
+        )
+
+    def _handle_conflict(self, error: WriteConflictError) -> None:
+        QMessageBox.warning(
+            self,
+            "Save Changes",
+            f"{error}.\n\nThose edits were discarded: the accounts they changed were deleted, "
+            "or the usernames they added were added, by the other process.",
+        )
+
+    def _handle_load_failed(self, message: str) -> None:
+        QMessageBox.critical(self, "Open Storage", message)
+        self.close()
+
+    def _handle_tab_changed(self, index: int) -> None:
+        service = self._tabs.tabText(index)
+        if self._loader is not None:
+            self._loader.prioritise(service)
+        self._service_tab(service)
+        self._schedule_prefetch()
+
+    def _handle_search_edited(self, text: str) -> None:
+        self._search_matches = {}
+        if text.strip():
+            results = self._prefix_index.search(text, self.SEARCH_LIMIT)
+            if len(results) < self.SEARCH_LIMIT:
+                results += self._fuzzy_index.search(text, self.SEARCH_LIMIT - len(results))
+            for result in results:
+                label = f"{result.account.username} — {result.service}"
+                self._search_matches[label] = (result.service, result.account.id)
+        self._search_model.setStringList(list(self._search_matches))
+
+    def _handle_search_activated(self, label: str) -> None:
+        match = self._search_matches.get(label)
+        if match is None:
+            return
+        service, account_id = match
+        tab = self._service_tab(service)
+        if tab is None:
+            return
+        self._tabs.setCurrentWidget(self._pages[service])
+        tab.select_account(account_id)
+
 
-        self.setCentralWidget(self._tabs)
+def run_app(storage_path: str | Path | None = None) -> None:
+    """Run the GUI against the backend selected by ``storage_path``.
 
+    ``storage_path`` may be a plain path (the backend is picked from its
+    extension) or a URL such as ``sqlite:///path/to/vault.db``; see
+    :func:`~.backends.open_store`.  The window is shown before the store
+    is opened, which happens on a background thread.
+    """
 
-def run_app(storage_path: Path | None = None) -> None:
+    started = time.perf_counter()
     app = QApplication([])
-    store = DataStore(storage_path)
-    window = MainWindow(store)
+    window = MainWindow()
     window.show()
+    window.load(storage_path, started)
+    app.aboutToQuit.connect(window.close_store)
     app.exec()
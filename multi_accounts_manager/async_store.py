@@ -0,0 +1,162 @@
+"""asyncio front end for the storage backends."""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, TypeVar
+
+from .backends import StorageBackend, open_store
+from .data_store import Account
+from .events import ChangeEvent, ChangeListener
+from .views import AccountsView, ServicesView
+
+T = TypeVar("T")
+
+_Mutation = Callable[[StorageBackend], object]
+
+
+class AsyncDataStore:
+    """Coroutine interface to a :class:`~.backends.StorageBackend`.
+
+    Every call that may touch the disk or wait for the store lock runs in
+    ``executor`` (the loop's default executor unless given), so the event
+    loop never blocks on it.  Mutations awaited concurrently are coalesced:
+    they are queued, and whatever has accumulated while the previous group
+    was being written is applied in one :meth:`~.data_store.DataStore.batch`
+    and written once.  A mutation that raises (say, a
+    :class:`~.data_store.DuplicateAccountError`) fails only its own caller;
+    the rest of its group is still committed.  When the coroutine returns the
+    change has been written, unless the wrapped store defers writes to an
+    autosave thread.
+    """
+
+    def __init__(self, store: StorageBackend, *, executor: Executor | None = None) -> None:
+        self._store = store
+        self._executor = executor
+        self._queue: List[Tuple[_Mutation, asyncio.Future[object]]] = []
+        self._writer: asyncio.Task[None] | None = None
+
+    @classmethod
+    async def open(cls, location: str | Path | None = None, *, executor: Executor | None = None) -> "AsyncDataStore":
+        """Open (and load) the store at ``location`` as :func:`~.backends.open_store` would."""
+
+        loop = asyncio.get_running_loop()
+        store = await loop.run_in_executor(executor, open_store, location)
+        return cls(store, executor=executor)
+
+    @property
+    def store(self) -> StorageBackend:
+        """The wrapped store, for synchronous use from other threads."""
+
+        return self._store
+
+    async def _run(self, call: Callable[..., T], *args: object) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call, *args)
+
+    async def load(self) -> None:
+        await self.drain()
+        await self._run(self._store.load)
+
+    async def save(self) -> None:
+        await self.drain()
+        await self._run(self._store.save)
+
+    async def flush(self) -> None:
+        await self.drain()
+        await self._run(self._store.flush)
+
+    async def close(self) -> None:
+        await self.drain()
+        await self._run(self._store.close)
+
+    async def list_accounts(self, service_name: str) -> AccountsView:
+        return await self._run(self._store.list_accounts, service_name)
+
+    async def all_services(self) -> ServicesView:
+        return await self._run(self._store.all_services)
+
+    async def copy_accounts(self) -> Dict[str, List[Account]]:
+        return await self._run(self._store.copy_accounts)
+
+    async def copy_service(self, service_name: str) -> Tuple[List[Account], int]:
+        return await self._run(self._store.copy_service, service_name)
+
+    async def find_account(self, service_name: str, username: str) -> Account | None:
+        return await self._run(self._store.find_account, service_name, username)
+
+    async def get_account(self, account_id: str) -> Account | None:
+        return await self._run(self._store.get_account, account_id)
+
+    async def add_account(self, service_name: str, account: Account) -> None:
+        await self._mutate(lambda store: store.add_account(service_name, account))
+
+    async def set_accounts(self, service_name: str, accounts: List[Account]) -> None:
+        await self._mutate(lambda store: store.set_accounts(service_name, accounts))
+
+    async def update_account_by_id(self, account_id: str, account: Account) -> bool:
+        return bool(await self._mutate(lambda store: store.update_account_by_id(account_id, account)))
+
+    async def delete_account_by_id(self, account_id: str) -> bool:
+        return bool(await self._mutate(lambda store: store.delete_account_by_id(account_id)))
+
+    def subscribe(self, listener: ChangeListener) -> Callable[[], None]:
+        """Call ``listener`` on the running loop's thread for every change."""
+
+        loop = asyncio.get_running_loop()
+
+        def forward(event: ChangeEvent) -> None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(listener, event)
+
+        return self._store.subscribe(forward)
+
+    async def drain(self) -> None:
+        """Wait until every queued mutation has been applied and written."""
+
+        while self._writer is not None:
+            await asyncio.shield(self._writer)
+
+    async def _mutate(self, mutation: _Mutation) -> object:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[object] = loop.create_future()
+        self._queue.append((mutation, future))
+        if self._writer is None:
+            self._writer = loop.create_task(self._write_queued())
+        return await future
+
+    async def _write_queued(self) -> None:
+        try:
+            # Let callers scheduled in the same loop iteration join the first group.
+            await asyncio.sleep(0)
+            while self._queue:
+                group, self._queue = self._queue, []
+                try:
+                    outcomes = await self._run(self._apply, [mutation for mutation, _ in group])
+                except Exception as exc:
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(exc)
+                    continue
+                for (_, future), (result, error) in zip(group, outcomes):
+                    if future.done():
+                        continue
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+        finally:
+            self._writer = None
+
+    def _apply(self, mutations: List[_Mutation]) -> List[Tuple[object, Exception | None]]:
+        """Apply ``mutations`` in one batch (executor thread); return each outcome."""
+
+        outcomes: List[Tuple[object, Exception | None]] = []
+        with self._store.batch():
+            for mutation in mutations:
+                try:
+                    outcomes.append((mutation(self._store), None))
+                except Exception as exc:
+                    outcomes.append((None, exc))
+        return outcomes
@@ -0,0 +1,111 @@
+"""Debounced background saving for :class:`~.data_store.DataStore`."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .locking import WriteConflictError
+
+if TYPE_CHECKING:
+    from .data_store import DataStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AutosavePolicy:
+    """How long dirty state may wait before it is written.
+
+    A write happens once no mutation has arrived for ``delay`` seconds, so a
+    burst of edits is merged into one write.  ``max_delay`` bounds how long a
+    continuous stream of mutations can postpone that write.
+    """
+
+    delay: float = 0.5
+    max_delay: float = 5.0
+
+
+@dataclass
+class WriteStats:
+    """Latency of the writes performed by a store."""
+
+    count: int = 0
+    last_seconds: float = 0.0
+    max_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def average_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.last_seconds = seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.total_seconds += seconds
+
+
+class SaveScheduler:
+    """Daemon thread that flushes a dirty store once mutations settle."""
+
+    def __init__(self, store: "DataStore", policy: AutosavePolicy | None = None) -> None:
+        self._store = store
+        self._policy = policy or AutosavePolicy()
+        self._condition = threading.Condition()
+        self._first_dirty: float | None = None
+        self._last_dirty = 0.0
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def policy(self) -> AutosavePolicy:
+        return self._policy
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def mark_dirty(self) -> None:
+        with self._condition:
+            now = time.monotonic()
+            if self._first_dirty is None:
+                self._first_dirty = now
+            self._last_dirty = now
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._first_dirty is not None:
+                        due = min(self._last_dirty + self._policy.delay, self._first_dirty + self._policy.max_delay)
+                        timeout = due - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                self._first_dirty = None
+            try:
+                self._store.flush()
+            except OSError:
+                logger.exception("Autosave of %s failed", self._store.storage_path)
+            except WriteConflictError as exc:
+                # The rest was written; the store's conflict listeners tell the user.
+                logger.warning("Autosave dropped changes: %s", exc)
@@ -0,0 +1,208 @@
+"""Storage backend protocol and selection of a backend from a location."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, List, Optional, Protocol, Tuple, runtime_checkable
+
+from .autosave import AutosavePolicy
+from .binary_store import BinaryDataStore
+from .compaction import CompactionPolicy
+from .data_store import DEFAULT_DATA_FILE, Account, DataStore, ServiceData
+from .events import ChangeListener
+from .locking import ConflictListener
+from .sharded_store import ShardedDataStore
+from .sqlite_store import SqliteDataStore
+from .views import AccountsView, ServicesView
+from .watcher import WatchPolicy
+
+if TYPE_CHECKING:
+    from .search import AccountIndex
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """Interface the GUI relies on, implemented by every storage backend."""
+
+    @property
+    def storage_path(self) -> Path: ...
+
+    def load(self) -> None: ...
+
+    def save(self) -> None: ...
+
+    def flush(self) -> None: ...
+
+    def close(self) -> None: ...
+
+    def batch(self) -> ContextManager[object]: ...
+
+    def get_service(self, service_name: str) -> ServiceData:
+        """Return the service, creating it if needed.
+
+        Whether the result is live or a detached copy depends on the backend
+        (the SQLite one returns a copy), so callers must not mutate it and
+        should go through the store's methods instead.
+        """
+        ...
+
+    def set_accounts(self, service_name: str, accounts: List[Account]) -> None: ...
+
+    def add_account(self, service_name: str, account: Account) -> None: ...
+
+    def update_account(self, service_name: str, index: int, account: Account) -> None: ...
+
+    def delete_account(self, service_name: str, index: int) -> None: ...
+
+    def get_account(self, account_id: str) -> Account | None: ...
+
+    def update_account_by_id(self, account_id: str, account: Account) -> bool: ...
+
+    def delete_account_by_id(self, account_id: str) -> bool: ...
+
+    def find_account(self, service_name: str, username: str) -> Account | None: ...
+
+    def list_accounts(self, service_name: str) -> AccountsView: ...
+
+    def all_services(self) -> ServicesView: ...
+
+    def copy_accounts(self) -> Dict[str, List[Account]]: ...
+
+    def copy_service(self, service_name: str) -> Tuple[List[Account], int]: ...
+
+    @property
+    def generation(self) -> int: ...
+
+    def service_generation(self, service_name: str) -> int: ...
+
+    def subscribe(self, listener: ChangeListener) -> Callable[[], None]: ...
+
+    def subscribe_conflicts(self, listener: ConflictListener) -> Callable[[], None]: ...
+
+    def attach_index(self, index: "AccountIndex") -> None: ...
+
+    def detach_index(self, index: "AccountIndex") -> None: ...
+
+
+BackendFactory = Callable[[Path], StorageBackend]
+
+
+@dataclass
+class BackendSpec:
+    """A registered backend: its URL scheme, factory and how to recognise paths.
+
+    A plain path selects this backend if ``detect`` returns ``True`` for it
+    (checked first, in registration order) or if it ends in one of
+    ``extensions``.
+    """
+
+    scheme: str
+    factory: BackendFactory
+    extensions: Tuple[str, ...] = ()
+    detect: Optional[Callable[[Path], bool]] = None
+
+    def matches_extension(self, path: Path) -> bool:
+        name = path.name.lower()
+        return any(name.endswith(extension) for extension in self.extensions)
+
+
+_BACKENDS: Dict[str, BackendSpec] = {}
+DEFAULT_SCHEME = "json"
+
+
+def register_backend(
+    scheme: str,
+    factory: BackendFactory,
+    *,
+    extensions: Tuple[str, ...] = (),
+    detect: Callable[[Path], bool] | None = None,
+) -> None:
+    """Make ``scheme://`` URLs (and paths recognised by the spec) open ``factory``."""
+
+    _BACKENDS[scheme] = BackendSpec(
+        scheme=scheme,
+        factory=factory,
+        extensions=tuple(extension.lower() for extension in extensions),
+        detect=detect,
+    )
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def resolve_location(location: str | Path) -> Tuple[BackendSpec, Path]:
+    """Split ``location`` into the backend to use and the path to open.
+
+    ``location`` is either a URL such as ``sqlite:///srv/vault.db`` or a plain
+    path, in which case the backend is recognised from what exists on disk
+    (a journal next to a JSON file, a shard directory) or from the file
+    extension, falling back to the JSON store.
+    """
+
+    text = str(location)
+    scheme, separator, remainder = text.partition("://")
+    if separator:
+        spec = _BACKENDS.get(scheme.lower())
+        if spec is None:
+            raise ValueError(f"Unknown storage backend {scheme!r}; expected one of {available_backends()}")
+        return spec, Path(remainder).expanduser()
+    path = Path(text).expanduser()
+    for spec in _BACKENDS.values():
+        if spec.detect is not None and spec.detect(path):
+            return spec, path
+    for spec in _BACKENDS.values():
+        if spec.matches_extension(path):
+            return spec, path
+    return _BACKENDS[DEFAULT_SCHEME], path
+
+
+def open_store(location: str | Path | None = None) -> StorageBackend:
+    """Open the backend selected by ``location`` (the default JSON file if ``None``)."""
+
+    if location is None:
+        return _BACKENDS[DEFAULT_SCHEME].factory(DEFAULT_DATA_FILE)
+    spec, path = resolve_location(location)
+    return spec.factory(path)
+
+
+def _open_json(path: Path) -> StorageBackend:
+    return DataStore(path, autosave=AutosavePolicy(), lazy=True, unique_usernames=True, watch=WatchPolicy())
+
+
+def _open_journaled_json(path: Path) -> StorageBackend:
+    return DataStore(
+        path,
+        journal=True,
+        compaction=CompactionPolicy(),
+        autosave=AutosavePolicy(),
+        lazy=True,
+        unique_usernames=True,
+        watch=WatchPolicy(),
+    )
+
+
+def _has_journal(path: Path) -> bool:
+    # A plain JSON store would ignore (and later overwrite) the journal.
+    return path.suffix.lower() == ".json" and path.with_name(path.name + ".journal").exists()
+
+
+def _open_sharded(path: Path) -> StorageBackend:
+    return ShardedDataStore(path, autosave=AutosavePolicy(), lazy=True, unique_usernames=True, watch=WatchPolicy())
+
+
+def _open_binary(path: Path) -> StorageBackend:
+    return BinaryDataStore(path, autosave=AutosavePolicy(), lazy=True, unique_usernames=True, watch=WatchPolicy())
+
+
+def _open_sqlite(path: Path) -> StorageBackend:
+    # Switching ``vault.json`` to ``vault.db`` carries the existing accounts over.
+    return SqliteDataStore(path, migrate_from=path.with_suffix(".json"), unique_usernames=True)
+
+
+register_backend("json", _open_json, extensions=(".json",))
+register_backend("journal", _open_journaled_json, detect=_has_journal)
+register_backend("shards", _open_sharded, extensions=(".shards",), detect=Path.is_dir)
+register_backend("binary", _open_binary, extensions=(".mamb",))
+register_backend("sqlite", _open_sqlite, extensions=(".sqlite", ".sqlite3", ".db"))
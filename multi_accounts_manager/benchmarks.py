@@ -0,0 +1,552 @@
+"""Benchmarks for the storage layer.
+
+Run with ``python -m multi_accounts_manager.benchmarks <name>``; see
+``--help`` for the available benchmarks and their options.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import string
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from .async_store import AsyncDataStore
+from .autosave import AutosavePolicy
+from .binary_store import BinaryDataStore
+from .data_store import Account, DataStore, ServiceData, new_account_id
+from .search import PrefixIndex, TrigramIndex
+from .sharded_store import ShardedDataStore
+
+SERVICE_COUNT = 9
+EMAIL_DOMAINS = ("gmail.com", "yahoo.com", "outlook.com", "mail.ru", "yandex.ru", "example.com")
+
+
+def synthetic_services(total: int, service_count: int = SERVICE_COUNT) -> Dict[str, List[Account]]:
+    """``total`` accounts spread evenly over ``service_count`` services."""
+
+    services: Dict[str, List[Account]] = {f"Service {index}": [] for index in range(service_count)}
+    names = list(services)
+    for index in range(total):
+        services[names[index % service_count]].append(
+            Account(username=f"user{index}@example.com", password=f"pw-{index:012d}-secret")
+        )
+    return services
+
+
+def _timed(action: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    action()
+    return time.perf_counter() - started
+
+
+def _fill(store: DataStore, services: Dict[str, List[Account]]) -> None:
+    with store.batch():
+        for name, accounts in services.items():
+            store.set_accounts(name, list(accounts))
+
+
+def bench_formats(sizes: Sequence[int], directory: Path) -> List[Dict[str, object]]:
+    """Compare save/load times of the JSON and binary snapshot formats."""
+
+    results: List[Dict[str, object]] = []
+    for size in sizes:
+        services = synthetic_services(size)
+        first_service = next(iter(services))
+        for label, factory, suffix in (("json", DataStore, ".json"), ("binary", BinaryDataStore, ".mamb")):
+            path = directory / f"bench-{size}{suffix}"
+            path.unlink(missing_ok=True)
+            store = factory(path)
+            row: Dict[str, object] = {"format": label, "accounts": size}
+            row["save_s"] = _timed(lambda: _fill(store, services))
+            row["size_mb"] = path.stat().st_size / 1_000_000
+            row["load_s"] = _timed(lambda: factory(path))
+            row["lazy_first_service_s"] = _timed(lambda: factory(path, lazy=True).list_accounts(first_service))
+            results.append(row)
+    return results
+
+
+def _random_username(rng: random.Random) -> str:
+    name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+    if rng.random() < 0.5:
+        name += "." + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+    return f"{name}{rng.randint(0, 999)}@{rng.choice(EMAIL_DOMAINS)}"
+
+
+def bench_search(sizes: Sequence[int], queries: int = 1_000) -> List[Dict[str, object]]:
+    """Build time of the search indexes and their average query/update latency."""
+
+    results: List[Dict[str, object]] = []
+    for size in sizes:
+        services = {name: ServiceData(name, accounts) for name, accounts in synthetic_services(size).items()}
+        index = PrefixIndex()
+        row: Dict[str, object] = {"accounts": size}
+        row["build_s"] = _timed(lambda: index.rebuild(services))
+        prefixes = [f"user{number % size}" for number in range(0, queries * 7919, 7919)]
+        row["query_ms"] = _timed(lambda: [index.search(prefix, 50) for prefix in prefixes]) * 1000 / queries
+        extra = [Account(username=f"new{number}@example.com", password="secret") for number in range(queries)]
+        row["add_remove_ms"] = (
+            _timed(lambda: [(index.add("Service 0", account), index.remove("Service 0", account)) for account in extra])
+            * 1000
+            / queries
+        )
+        # ``userN@example.com`` names all look alike, which is meaningless for
+        # similarity ranking; use varied names for the fuzzy index instead.
+        rng = random.Random(size)
+        varied = {
+            name: ServiceData(name, [replace(account, username=_random_username(rng)) for account in service.accounts])
+            for name, service in services.items()
+        }
+        fuzzy = TrigramIndex()
+        row["fuzzy_build_s"] = _timed(lambda: fuzzy.rebuild(varied))
+        samples = rng.sample([account.username for service in varied.values() for account in service.accounts], 100)
+        typos = [sample[:2] + sample[3] + sample[2] + sample[4:] for sample in samples]
+        row["fuzzy_query_ms"] = _timed(lambda: [fuzzy.search(typo) for typo in typos]) * 1000 / len(typos)
+        results.append(row)
+    return results
+
+
+@dataclass
+class _DictAccount:
+    """The previous ``Account`` layout (plain dataclass with a ``__dict__``)."""
+
+    username: str
+    password: str
+    id: str = field(default_factory=new_account_id)
+
+
+def _traced_bytes(build: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def bench_memory(sizes: Sequence[int]) -> List[Dict[str, object]]:
+    """Bytes per account of the previous and the current ``Account`` layout.
+
+    ``object_bytes`` counts the account objects and the list holding them;
+    ``total_bytes`` also counts their username, password and id strings.
+    """
+
+    results: List[Dict[str, object]] = []
+    for size in sizes:
+        fields = [(f"user{index}@example.com", f"pw-{index:012d}-secret", new_account_id()) for index in range(size)]
+        strings = sum(sys.getsizeof(value) for values in fields for value in values)
+        for label, factory in (("dict", _DictAccount), ("slots", Account)):
+            objects = _traced_bytes(lambda: [factory(*values) for values in fields])
+            results.append(
+                {
+                    "layout": label,
+                    "accounts": size,
+                    "object_bytes": objects / size,
+                    "total_bytes": (objects + strings) / size,
+                }
+            )
+    return results
+
+
+WRITER_STORES: Dict[str, Tuple[Callable[..., DataStore], str, Dict[str, object]]] = {
+    "json": (DataStore, "vault.json", {}),
+    "journal": (DataStore, "vault.json", {"journal": True}),
+    "sharded": (ShardedDataStore, "vault.shards", {"journal": True}),
+    "binary": (BinaryDataStore, "vault.mamb", {}),
+}
+
+
+def _writer(mode: str, path: str, worker: int, operations: int, locking: bool) -> Dict[str, Tuple[str, str, str]]:
+    """Mutate the store at ``path`` from a separate process.
+
+    Every operation adds an account; every third also changes the password
+    of one added earlier and every fifth deletes one, always by id.  Returns
+    the accounts this writer expects to survive, keyed by id.
+    """
+
+    factory, _, options = WRITER_STORES[mode]
+    store = factory(Path(path), unique_usernames=True, locking=locking, **options)
+    rng = random.Random(worker)
+    expected: Dict[str, Tuple[str, str, str]] = {}
+    for operation in range(operations):
+        account = Account(username=f"writer{worker}-{operation}", password=f"pw-{operation}")
+        service = f"Service {operation % 3}"
+        store.add_account(service, account)
+        expected[account.id] = (service, account.username, account.password)
+        if operation % 3 == 2:
+            account_id = rng.choice(list(expected))
+            service, username, _ = expected[account_id]
+            store.update_account_by_id(account_id, Account(username=username, password=f"changed-{operation}"))
+            expected[account_id] = (service, username, f"changed-{operation}")
+        if operation % 5 == 4:
+            account_id = rng.choice(list(expected))
+            store.delete_account_by_id(account_id)
+            del expected[account_id]
+    store.close()
+    return expected
+
+
+def stress_writers(
+    modes: Sequence[str], processes: int, operations: int, directory: Path, locking: bool = True
+) -> List[Dict[str, object]]:
+    """Run ``processes`` concurrent writers per store type and check nothing was lost.
+
+    ``lost`` counts accounts a writer added or changed that are missing or
+    stale in the final store; ``unexpected`` counts accounts that should not
+    be there (deleted ones that came back).  Both must be zero.
+    """
+
+    results: List[Dict[str, object]] = []
+    with multiprocessing.Pool(processes) as pool:
+        for mode in modes:
+            factory, name, options = WRITER_STORES[mode]
+            path = directory / mode / name
+            path.parent.mkdir()
+            factory(path, **options).close()
+            started = time.perf_counter()
+            outcomes = pool.starmap(
+                _writer, [(mode, str(path), worker, operations, locking) for worker in range(processes)]
+            )
+            elapsed = time.perf_counter() - started
+            expected = {account_id: state for outcome in outcomes for account_id, state in outcome.items()}
+            store = factory(path, **options)
+            actual = {
+                account.id: (service, account.username, account.password)
+                for service, data in store.all_services().items()
+                for account in data.accounts
+            }
+            store.close()
+            results.append(
+                {
+                    "store": mode,
+                    "writes": processes * operations,
+                    "writes_per_s": processes * operations / elapsed,
+                    "lost": sum(1 for account_id, state in expected.items() if actual.get(account_id) != state),
+                    "unexpected": len(actual.keys() - expected.keys()),
+                }
+            )
+    return results
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def _check_consistency(store: DataStore, prefix: PrefixIndex, fuzzy: TrigramIndex) -> List[str]:
+    """Problems found comparing the store's accounts with its lookup structures."""
+
+    problems: List[str] = []
+    services = store.copy_accounts()
+    total = sum(len(accounts) for accounts in services.values())
+    for name, accounts in services.items():
+        for position, account in enumerate(accounts):
+            if store.locate(account.id) != (name, position):
+                problems.append(f"locate({account.id}) != {(name, position)}")
+            if store.find_account(name, account.username) != account:
+                problems.append(f"find_account({name!r}, {account.username!r}) misses {account.id}")
+    if len(prefix) != total or len(fuzzy) != total:
+        problems.append(f"indexes hold {len(prefix)}/{len(fuzzy)} accounts, the store {total}")
+    return problems
+
+
+def stress_threads(
+    size: int, readers: int, writers: int, operations: int, directory: Path
+) -> List[Dict[str, object]]:
+    """Write latency with and without concurrent readers, and a race check.
+
+    Writer threads add, update and delete accounts by id while reader
+    threads repeatedly copy the whole store, look accounts up and query the
+    search indexes.  Afterwards the store must hold exactly the accounts the
+    writers expect, and its lookups and indexes must agree with it;
+    ``problems`` counts every discrepancy and must be zero.
+    """
+
+    results: List[Dict[str, object]] = []
+    # Switching threads far more often than usual makes races surface.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        for reader_count in (0, readers):
+            results.append(_stress_round(size, reader_count, writers, operations, directory))
+    finally:
+        sys.setswitchinterval(interval)
+    return results
+
+
+def _stress_round(size: int, reader_count: int, writers: int, operations: int, directory: Path) -> Dict[str, object]:
+    store = DataStore(directory / f"threads-{reader_count}.json", journal=True, autosave=AutosavePolicy())
+    _fill(store, synthetic_services(size))
+    prefix, fuzzy = PrefixIndex(), TrigramIndex()
+    store.attach_index(prefix)
+    store.attach_index(fuzzy)
+    expected = {account.id: account for accounts in store.copy_accounts().values() for account in accounts}
+    latencies: List[float] = []
+    problems: List[str] = []
+    reads = [0] * reader_count
+    stopped = threading.Event()
+
+    def read(slot: int) -> None:
+        rng = random.Random(slot)
+        while not stopped.is_set():
+            services = store.copy_accounts()
+            if len({account.id for accounts in services.values() for account in accounts}) != sum(
+                len(accounts) for accounts in services.values()
+            ):
+                problems.append("copy_accounts returned an account twice")
+            name = rng.choice(list(services))
+            if services[name]:
+                account = rng.choice(services[name])
+                found = store.find_account(name, account.username)
+                if found is not None and found.id != account.id:
+                    problems.append(f"find_account returned {found.id} for {account.id}")
+            prefix.search(f"user{rng.randrange(size)}", 50)
+            fuzzy.search(_random_username(rng), 20)
+            reads[slot] += 1
+            stopped.wait(0.001)
+
+    def write(slot: int) -> None:
+        rng = random.Random(1_000 + slot)
+        own: List[str] = []
+        for operation in range(operations):
+            started = time.perf_counter()
+            if operation % 3 == 0 or not own:
+                account = Account(username=f"thread{slot}-{operation}@example.com", password="secret")
+                store.add_account(f"Service {operation % SERVICE_COUNT}", account)
+                own.append(account.id)
+            elif operation % 3 == 1:
+                account_id = rng.choice(own)
+                account = Account(username=expected[account_id].username, password=f"changed-{operation}")
+                store.update_account_by_id(account_id, account)
+                account = replace(account, id=account_id)
+            else:
+                account_id = own.pop(rng.randrange(len(own)))
+                store.delete_account_by_id(account_id)
+                account = None
+            latencies.append(time.perf_counter() - started)
+            if account is None:
+                expected.pop(account_id)
+            else:
+                expected[account.id] = account
+
+    threads = [threading.Thread(target=read, args=(slot,)) for slot in range(reader_count)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=write, args=(slot,)) for slot in range(writers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    stopped.set()
+    for thread in threads:
+        thread.join()
+    actual = {account.id: account for accounts in store.copy_accounts().values() for account in accounts}
+    if actual != expected:
+        problems.append(f"{len(actual.keys() ^ expected.keys())} accounts differ from what the writers expect")
+    problems += _check_consistency(store, prefix, fuzzy)
+    store.close()
+    for problem in problems[:10]:
+        print(problem, file=sys.stderr)
+    return {
+        "readers": reader_count,
+        "writes_per_s": len(latencies) / elapsed,
+        "write_p50_ms": _percentile(latencies, 0.5) * 1000,
+        "write_p99_ms": _percentile(latencies, 0.99) * 1000,
+        "scans": sum(reads),
+        "problems": len(problems),
+    }
+
+
+async def _loop_lag(stopped: asyncio.Event, lags: List[float]) -> None:
+    """Record how late the loop wakes a task that sleeps for a millisecond."""
+
+    loop = asyncio.get_running_loop()
+    while not stopped.is_set():
+        started = loop.time()
+        await asyncio.sleep(0.001)
+        lags.append(loop.time() - started - 0.001)
+
+
+async def _async_round(path: Path, size: int, concurrency: int, coalesce: bool) -> Dict[str, object]:
+    store = DataStore(path)
+    _fill(store, synthetic_services(size))
+    writes = store.write_stats.count
+    wrapper = AsyncDataStore(store)
+    accounts = [Account(username=f"user{index}@example.com", password="secret") for index in range(concurrency)]
+    stopped = asyncio.Event()
+    lags: List[float] = []
+    ticker = asyncio.create_task(_loop_lag(stopped, lags))
+    await asyncio.sleep(0.002)
+    started = time.perf_counter()
+    if coalesce:
+        await asyncio.gather(*(wrapper.add_account("Service 0", account) for account in accounts))
+    else:
+        for account in accounts:
+            store.add_account("Service 0", account)
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    stopped.set()
+    await ticker
+    writes = store.write_stats.count - writes
+    await wrapper.close()
+    return {
+        "mode": "async" if coalesce else "blocking",
+        "concurrent_adds": concurrency,
+        "writes": writes,
+        "total_ms": elapsed * 1000,
+        "max_loop_lag_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+def bench_async(concurrency: Sequence[int], directory: Path, size: int = 100_000) -> List[Dict[str, object]]:
+    """Concurrent ``add_account`` calls from asyncio: blocking calls vs :class:`AsyncDataStore`.
+
+    The store starts with ``size`` accounts, so every write rewrites a
+    sizeable snapshot.  ``writes`` counts the writes the additions took and
+    ``max_loop_lag_ms`` the longest the event loop was unable to run
+    anything else.
+    """
+
+    results: List[Dict[str, object]] = []
+    for count in concurrency:
+        for coalesce in (False, True):
+            path = directory / f"async-{count}-{coalesce}.json"
+            results.append(asyncio.run(_async_round(path, size, count, coalesce)))
+    return results
+
+
+def bench_startup(sizes: Sequence[int], directory: Path) -> List[Dict[str, object]]:
+    """Time to first paint of the main window, loading the store before it or behind it.
+
+    ``blocking`` opens the store before showing the window, as the
+    application used to; ``background`` shows the window first and lets
+    :meth:`~.app.MainWindow.load` fill it in.  Either way only the current
+    tab is built during startup.  Needs PyQt6; set
+    ``QT_QPA_PLATFORM=offscreen`` to run without a display.
+    """
+
+    from PyQt6.QtWidgets import QApplication
+
+    from .app import SERVICES, MainWindow
+    from .backends import open_store
+
+    app = QApplication.instance() or QApplication([])
+    results: List[Dict[str, object]] = []
+    for size in sizes:
+        path = directory / f"startup-{size}.json"
+        store = DataStore(path)
+        _fill(store, dict(zip(SERVICES, synthetic_services(size, len(SERVICES)).values())))
+        store.close()
+        for mode in ("blocking", "background"):
+            started = time.perf_counter()
+            if mode == "blocking":
+                opened = open_store(path)
+                # The window measures its stages from its own creation.
+                offset = (time.perf_counter() - started) * 1000
+                window = MainWindow(opened)
+                window.show()
+            else:
+                offset = 0.0
+                window = MainWindow()
+                window.show()
+                window.load(path, started)
+            while "services_ready" not in window.startup_timings or "first_paint" not in window.startup_timings:
+                app.processEvents()
+            timings = window.startup_timings
+            results.append(
+                {
+                    "accounts": size,
+                    "mode": mode,
+                    "first_paint_ms": timings["first_paint"] + offset,
+                    "current_tab_ms": timings["current_tab_ready"] + offset,
+                    "all_tabs_ms": timings["services_ready"] + offset,
+                }
+            )
+            window.close_store()
+            window.close()
+            window.deleteLater()
+    return results
+
+
+def _print_table(rows: List[Dict[str, object]]) -> None:
+    if not rows:
+        return
+    columns = list(rows[0])
+    print("  ".join(f"{column:>20}" for column in columns))
+    for row in rows:
+        cells = (f"{value:>20.4f}" if isinstance(value, float) else f"{value!s:>20}" for value in row.values())
+        print("  ".join(cells))
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m multi_accounts_manager.benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    formats = commands.add_parser("formats", help="JSON vs binary snapshot save/load times")
+    formats.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    search = commands.add_parser("search", help="prefix search index build, query and update latency")
+    search.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    memory = commands.add_parser("memory", help="bytes per account of the account record layouts")
+    memory.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    writers = commands.add_parser("writers", help="concurrent writer processes; verifies no update is lost")
+    writers.add_argument("--stores", nargs="+", choices=list(WRITER_STORES), default=list(WRITER_STORES))
+    writers.add_argument("--processes", type=int, default=8)
+    writers.add_argument("--operations", type=int, default=200)
+    writers.add_argument("--no-locking", action="store_true", help="disable file locking to show what it prevents")
+    threads = commands.add_parser("threads", help="reader/writer threads on one store; checks for races")
+    threads.add_argument("--size", type=int, default=100_000)
+    threads.add_argument("--readers", type=int, default=4)
+    threads.add_argument("--writers", type=int, default=4)
+    threads.add_argument("--operations", type=int, default=500)
+    asynchronous = commands.add_parser("async", help="asyncio callers: write coalescing and event loop stalls")
+    asynchronous.add_argument("--concurrency", type=int, nargs="+", default=[10, 100])
+    asynchronous.add_argument("--size", type=int, default=100_000)
+    startup = commands.add_parser("startup", help="time to first paint of the main window (needs PyQt6)")
+    startup.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    arguments = parser.parse_args(argv)
+
+    if arguments.command == "search":
+        _print_table(bench_search(arguments.sizes))
+        return
+    if arguments.command == "memory":
+        _print_table(bench_memory(arguments.sizes))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        if arguments.command == "formats":
+            _print_table(bench_formats(arguments.sizes, Path(directory)))
+        elif arguments.command == "writers":
+            rows = stress_writers(
+                arguments.stores, arguments.processes, arguments.operations, Path(directory), not arguments.no_locking
+            )
+            _print_table(rows)
+            if not arguments.no_locking and any(row["lost"] or row["unexpected"] for row in rows):
+                sys.exit("updates were lost")
+        elif arguments.command == "startup":
+            _print_table(bench_startup(arguments.sizes, Path(directory)))
+        elif arguments.command == "async":
+            _print_table(bench_async(arguments.concurrency, Path(directory), arguments.size))
+        elif arguments.command == "threads":
+            rows = stress_threads(
+                arguments.size, arguments.readers, arguments.writers, arguments.operations, Path(directory)
+            )
+            _print_table(rows)
+            if any(row["problems"] for row in rows):
+                sys.exit("concurrent access left the store inconsistent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Compact binary snapshot format with a per-service offset table.
+
+File layout (all integers little-endian)::
+
+    header      magic "MAMB", u16 version, u16 field count, u32 service count,
+                u64 journal sequence number
+    fields      per account field: u16 length + UTF-8 field name
+    table       per service: u16 length + UTF-8 name, u32 account count,
+                u64 data offset, u64 data length
+    data        per service, per account, per field: u32 length + UTF-8 value
+
+The offset table lets a reader ``mmap`` the file and decode a single service
+without touching the others, and lets a writer copy the bytes of services
+that did not change instead of re-encoding them.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from .data_store import Account, DataStore, ServiceData, SnapshotState, _account_from_dict, _write_atomic
+
+MAGIC = b"MAMB"
+FORMAT_VERSION = 1
+ACCOUNT_FIELDS: Tuple[str, ...] = tuple(field.name for field in fields(Account))
+
+_HEADER = struct.Struct("<4sHHIQ")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_TABLE_ENTRY = struct.Struct("<IQQ")
+
+
+class BinaryFormatError(ValueError):
+    """Raised when a file is not a valid binary snapshot."""
+
+
+@dataclass
+class ServiceEntry:
+    """Location of one service's records inside a snapshot."""
+
+    name: str
+    count: int
+    offset: int
+    length: int
+
+
+def encode_accounts(accounts: Iterable[Account]) -> bytes:
+    chunks = bytearray()
+    pack = _U32.pack
+    for account in accounts:
+        for name in ACCOUNT_FIELDS:
+            value = getattr(account, name).encode("utf-8")
+            chunks += pack(len(value))
+            chunks += value
+    return bytes(chunks)
+
+
+def _encode_string(value: str, prefix: struct.Struct) -> bytes:
+    encoded = value.encode("utf-8")
+    return prefix.pack(len(encoded)) + encoded
+
+
+def write_snapshot(handle: BinaryIO, blobs: Mapping[str, Tuple[int, bytes]], seq: int = 0) -> None:
+    """Write a snapshot from pre-encoded ``{service: (count, data)}`` blobs."""
+
+    field_block = b"".join(_encode_string(name, _U16) for name in ACCOUNT_FIELDS)
+    table_size = sum(len(name.encode("utf-8")) + _U16.size + _TABLE_ENTRY.size for name in blobs)
+    offset = _HEADER.size + len(field_block) + table_size
+    table = bytearray()
+    for name, (count, data) in blobs.items():
+        table += _encode_string(name, _U16) + _TABLE_ENTRY.pack(count, offset, len(data))
+        offset += len(data)
+    handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(ACCOUNT_FIELDS), len(blobs), seq))
+    handle.write(field_block)
+    handle.write(table)
+    for _, data in blobs.values():
+        handle.write(data)
+    handle.flush()
+    os.fsync(handle.fileno())
+
+
+class BinarySnapshot:
+    """Read-only, memory-mapped view of a binary snapshot file."""
+
+    def __init__(self, path: Path) -> None:
+        with Path(path).open("rb") as handle:
+            try:
+                self._buffer: mmap.mmap | bytes = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self._buffer = b""
+        if len(self._buffer) < _HEADER.size:
+            raise BinaryFormatError(f"{path} is too short to be a binary snapshot")
+        magic, version, field_count, service_count, self.seq = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise BinaryFormatError(f"{path} is not a version {FORMAT_VERSION} binary snapshot")
+        position = _HEADER.size
+        field_names = []
+        for _ in range(field_count):
+            name, position = self._read_string(position, _U16)
+            field_names.append(name)
+        self.field_names: Tuple[str, ...] = tuple(field_names)
+        self.entries: Dict[str, ServiceEntry] = {}
+        for _ in range(service_count):
+            name, position = self._read_string(position, _U16)
+            count, offset, length = _TABLE_ENTRY.unpack_from(self._buffer, position)
+            position += _TABLE_ENTRY.size
+            self.entries[name] = ServiceEntry(name, count, offset, length)
+
+    def _read_string(self, position: int, prefix: struct.Struct) -> Tuple[str, int]:
+        (length,) = prefix.unpack_from(self._buffer, position)
+        start = position + prefix.size
+        return self._buffer[start : start + length].decode("utf-8"), start + length
+
+    def raw(self, name: str) -> Tuple[int, bytes]:
+        """Return ``(count, data)`` for a service in the current record layout.
+
+        The stored bytes are returned as-is when the file was written with the
+        current account fields, and re-encoded otherwise.
+        """
+
+        if self.field_names != ACCOUNT_FIELDS:
+            accounts = self.decode(name)
+            return len(accounts), encode_accounts(accounts)
+        entry = self.entries[name]
+        return entry.count, self._buffer[entry.offset : entry.offset + entry.length]
+
+    def decode(self, name: str) -> List[Account]:
+        entry = self.entries[name]
+        data = bytes(self._buffer[entry.offset : entry.offset + entry.length])
+        unpack = _U32.unpack_from
+        position = 0
+        values: List[str] = []
+        append = values.append
+        for _ in range(entry.count * len(self.field_names)):
+            (length,) = unpack(data, position)
+            position += 4
+            append(data[position : position + length].decode("utf-8"))
+            position += length
+        width = len(self.field_names)
+        rows = zip(*(iter(values),) * width)
+        if self.field_names == ACCOUNT_FIELDS:
+            return [Account(*row) for row in rows]
+        entries = (
+            {field: value for field, value in zip(self.field_names, row) if field in ACCOUNT_FIELDS} for row in rows
+        )
+        # Snapshots written before accounts had ids get the same derived ids as the JSON store.
+        return [_account_from_dict(entry, name, position) for position, entry in enumerate(entries)]
+
+
+class BinaryDataStore(DataStore):
+    """:class:`~.data_store.DataStore` persisted in the binary snapshot format.
+
+    Combined with ``lazy=True`` startup only parses the header and offset
+    table; each service is decoded from the memory map on first access.
+    Services that did not change since the last snapshot are copied
+    byte-for-byte on save instead of being re-encoded.
+    """
+
+    _snapshot: BinarySnapshot | None = None
+
+    def _read_snapshot(self) -> None:
+        self._snapshot = None
+        if not self._storage_path.exists():
+            return
+        try:
+            snapshot = BinarySnapshot(self._storage_path)
+        except (OSError, BinaryFormatError):
+            return
+        self._snapshot = snapshot
+        self._journal_seq = snapshot.seq
+        for name in snapshot.entries:
+            if self._lazy:
+                self._unloaded[name] = snapshot
+            else:
+                self._services[name] = self._materialise(name, snapshot)
+
+    def _materialise(self, service_name: str, handle: object) -> ServiceData:
+        assert isinstance(handle, BinarySnapshot)
+        return ServiceData(name=service_name, accounts=handle.decode(service_name))
+
+    def _unchanged_on_disk(self, service_name: str, shadow: DataStore) -> bool:
+        assert isinstance(shadow, BinaryDataStore)
+        previous, current = self._snapshot, shadow._snapshot
+        if previous is None or current is None or service_name not in previous.entries:
+            return False
+        return previous.raw(service_name) == current.raw(service_name)
+
+    def _adopt_disk_state(self, shadow: DataStore) -> None:
+        assert isinstance(shadow, BinaryDataStore)
+        self._snapshot = shadow._snapshot
+
+    def _prepare_snapshot(self, state: SnapshotState) -> Callable[[], None]:
+        blobs: Dict[str, Tuple[int, bytes]] = {}
+        for name, handle in state.unloaded.items():
+            assert isinstance(handle, BinarySnapshot)
+            blobs[name] = handle.raw(name)
+        previous = self._snapshot
+        for name, accounts in state.services.items():
+            if previous is not None and name in previous.entries and name not in state.changed:
+                blobs[name] = previous.raw(name)
+            else:
+                blobs[name] = (len(accounts), encode_accounts(accounts))
+        descriptor, temp_name = tempfile.mkstemp(
+            prefix=self._storage_path.name + ".", suffix=".tmp", dir=self._storage_path.parent
+        )
+        with os.fdopen(descriptor, "wb") as handle:
+            write_snapshot(handle, blobs, state.seq)
+
+        def publish() -> None:
+            os.replace(temp_name, self._storage_path)
+            self._snapshot = BinarySnapshot(self._storage_path)
+
+        return publish
+
+
+def services_to_blobs(services: Mapping[str, Sequence[Account]]) -> Dict[str, Tuple[int, bytes]]:
+    return {name: (len(accounts), encode_accounts(accounts)) for name, accounts in services.items()}
+
+
+def json_to_binary(json_path: Path, binary_path: Path) -> None:
+    """Convert a JSON store (the ``accounts_data.json`` layout) to a binary snapshot."""
+
+    source = DataStore(json_path, locking=False)
+    try:
+        services = {name: service.accounts for name, service in source.all_services().items()}
+    finally:
+        source.close()
+    binary_path = Path(binary_path)
+    descriptor, temp_name = tempfile.mkstemp(prefix=binary_path.name + ".", suffix=".tmp", dir=binary_path.parent)
+    with os.fdopen(descriptor, "wb") as handle:
+        write_snapshot(handle, services_to_blobs(services))
+    os.replace(temp_name, binary_path)
+
+
+def binary_to_json(binary_path: Path, json_path: Path) -> None:
+    """Convert a binary snapshot back to the JSON store layout."""
+
+    snapshot = BinarySnapshot(Path(binary_path))
+    serialised = {
+        name: {"accounts": [account.to_dict() for account in snapshot.decode(name)]} for name in snapshot.entries
+    }
+    _write_atomic(Path(json_path), json.dumps(serialised, indent=2))
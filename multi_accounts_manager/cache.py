@@ -0,0 +1,81 @@
+"""Memoisation of data derived from a store, invalidated by generation."""
+
+from __future__ import annotations
+
+from typing import Callable, Collection, Dict, Generic, Hashable, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class VersionedCache(Generic[K, V]):
+    """Values derived from store contents, recomputed only when they changed.
+
+    ``version`` returns the current version of a key, usually
+    ``store.service_generation`` for per-service values or
+    ``lambda _: store.generation`` for values derived from the whole store.
+    A cached value is returned as long as the version it was computed at is
+    still current, which costs a single comparison.  Since versions only ever
+    increase, a value can never be mistaken for a later one.
+
+    With a ``capacity``, the weights that ``weigh`` gives the cached values
+    never add up to more than it: a value that does not fit is returned but
+    not kept, and a stale value is dropped before its replacement is computed.
+
+    The cache itself is not thread-safe; callers that share one between
+    threads must serialise access to it.
+    """
+
+    def __init__(
+        self, version: Callable[[K], int], *, capacity: int | None = None, weigh: Callable[[V], int] = lambda _: 0
+    ) -> None:
+        self._version = version
+        self._capacity = capacity
+        self._weigh = weigh
+        self._weight = 0
+        self._entries: Dict[K, Tuple[int, V, int]] = {}
+
+    @property
+    def weight(self) -> int:
+        """Total weight of the cached values."""
+
+        return self._weight
+
+    def get(self, key: K, compute: Callable[[], V], version: int | None = None) -> V:
+        """Return the value for ``key``, calling ``compute`` if it is missing or stale.
+
+        ``version`` overrides the key's current version, for values derived
+        from a copy of the data captured earlier.
+        """
+
+        if version is None:
+            version = self._version(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        self.discard(key)
+        value = compute()
+        weight = self._weigh(value)
+        if self._capacity is None or self._weight + weight <= self._capacity:
+            self._entries[key] = (version, value, weight)
+            self._weight += weight
+        return value
+
+    def is_fresh(self, key: K) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] == self._version(key)
+
+    def discard(self, key: K) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._weight -= entry[2]
+
+    def retain(self, keys: Collection[K]) -> None:
+        """Drop every entry whose key is not in ``keys``."""
+
+        for key in [key for key in self._entries if key not in keys]:
+            self.discard(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._weight = 0
@@ -0,0 +1,105 @@
+"""Background compaction of the :class:`~.data_store.DataStore` journal."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .locking import WriteConflictError
+
+if TYPE_CHECKING:
+    from .data_store import DataStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompactionPolicy:
+    """When the journal should be folded into a fresh snapshot.
+
+    ``size_ratio`` triggers compaction once the journal grows past that
+    fraction of the snapshot size (journals smaller than ``min_journal_bytes``
+    are never compacted for size alone).  ``idle_seconds`` triggers it once no
+    mutation has happened for that long.  Either trigger can be disabled by
+    setting it to ``None``.
+    """
+
+    size_ratio: float | None = 0.5
+    idle_seconds: float | None = 30.0
+    min_journal_bytes: int = 64 * 1024
+
+    def size_exceeded(self, journal_bytes: int, snapshot_bytes: int) -> bool:
+        if self.size_ratio is None or journal_bytes < self.min_journal_bytes:
+            return False
+        return journal_bytes > self.size_ratio * snapshot_bytes
+
+
+class JournalCompactor:
+    """Daemon thread that checkpoints a journaled store when the policy fires."""
+
+    def __init__(self, store: "DataStore", policy: CompactionPolicy | None = None) -> None:
+        self._store = store
+        self._policy = policy or CompactionPolicy()
+        self._condition = threading.Condition()
+        self._last_mutation = time.monotonic()
+        self._requested = False
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def policy(self) -> CompactionPolicy:
+        return self._policy
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="journal-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def notify_mutation(self, journal_bytes: int, snapshot_bytes: int) -> None:
+        """Record activity and wake the worker if the size trigger fired."""
+
+        with self._condition:
+            self._last_mutation = time.monotonic()
+            if self._policy.size_exceeded(journal_bytes, snapshot_bytes):
+                self._requested = True
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and not self._requested:
+                    timeout = self._idle_timeout()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                self._requested = False
+                self._last_mutation = time.monotonic()
+            try:
+                self._store.compact()
+            except OSError:
+                logger.exception("Journal compaction of %s failed", self._store.storage_path)
+            except WriteConflictError as exc:
+                # The rest was written; the store's conflict listeners tell the user.
+                logger.warning("Journal compaction dropped changes: %s", exc)
+
+    def _idle_timeout(self) -> float | None:
+        """Seconds until the idle trigger fires, or ``None`` if it cannot fire."""
+
+        idle_seconds = self._policy.idle_seconds
+        if idle_seconds is None or not self._store.has_pending_journal():
+            return None if idle_seconds is None else idle_seconds
+        return self._last_mutation + idle_seconds - time.monotonic()
@@ -0,0 +1,102 @@
+"""Typed change events published by the stores."""
+
+from __future__ import annotations
+
+import enum
+import logging
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List
+
+if TYPE_CHECKING:
+    from .data_store import Account
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeKind(enum.Enum):
+    ADDED = "added"
+    UPDATED = "updated"
+    REMOVED = "removed"
+    # The whole service was replaced (set_accounts, a reload); re-read it.
+    RESET = "reset"
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """One change to a service's account list.
+
+    ``position`` is the account's index in the service right after an
+    addition or update and right before a removal, so applying events in
+    order to a copy of the list keeps it identical to the store's.
+    ``account`` is the new account for additions and updates and the removed
+    one for removals.  ``RESET`` events carry no account and ``position``
+    is ``-1``.  ``generation`` is the service's generation right after the
+    change, which lets a consumer that re-read the service skip events it
+    has already seen.
+    """
+
+    kind: ChangeKind
+    service: str
+    account_id: str | None = None
+    position: int = -1
+    account: "Account | None" = None
+    generation: int = 0
+
+
+ChangeListener = Callable[[ChangeEvent], None]
+
+
+class ChangeNotifier:
+    """Delivers change events to subscribed listeners.
+
+    While :meth:`hold` is in effect (a store batch is open) events are
+    queued; :meth:`release` delivers them, or drops them if the batch was
+    rolled back.  Listeners are called synchronously on the mutating thread,
+    in the order the changes happened; an exception raised by one is logged
+    and does not reach the code that mutated the store.
+    """
+
+    def __init__(self) -> None:
+        self._listeners: List[ChangeListener] = []
+        self._held: List[ChangeEvent] | None = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: ChangeListener) -> Callable[[], None]:
+        """Call ``listener`` for every future change; return an unsubscribe callable."""
+
+        with self._lock:
+            self._listeners = [*self._listeners, listener]
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._listeners = [existing for existing in self._listeners if existing is not listener]
+
+        return unsubscribe
+
+    @property
+    def has_listeners(self) -> bool:
+        return bool(self._listeners)
+
+    def hold(self) -> None:
+        if self._held is None:
+            self._held = []
+
+    def release(self, deliver: bool = True) -> None:
+        held, self._held = self._held, None
+        if deliver and held:
+            for event in held:
+                self._deliver(event)
+
+    def emit(self, event: ChangeEvent) -> None:
+        if self._held is not None:
+            self._held.append(event)
+        else:
+            self._deliver(event)
+
+    def _deliver(self, event: ChangeEvent) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Change listener %r failed on %s", listener, event)
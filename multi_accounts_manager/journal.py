@@ -0,0 +1,92 @@
+"""Append-only mutation journal used by :class:`~.data_store.DataStore`."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+
+class Journal:
+    """Line-delimited log of compact JSON mutation records.
+
+    Each record is written as a single line so that appending a mutation costs
+    time proportional to the record itself rather than to the whole vault.  A
+    record that was only partially written (for example because the process
+    was killed mid-append) is ignored during :meth:`replay`, and
+    :meth:`repair` removes it so that later appends start on a fresh line.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = Path(path)
+        self._intact_size: int | None = None
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def size(self) -> int:
+        try:
+            return self._path.stat().st_size
+        except OSError:
+            return 0
+
+    def append(self, records: Iterable[Dict[str, object]]) -> None:
+        lines = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        if not lines:
+            return
+        with self._path.open("a", encoding="utf-8") as handle:
+            handle.write(lines)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def replay(self) -> Iterator[Dict[str, object]]:
+        """Yield the records in order, stopping at the first torn or corrupt line."""
+
+        self._intact_size = 0
+        try:
+            handle = self._path.open("rb")
+        except OSError:
+            return
+        with handle:
+            for line in handle:
+                # Every append ends its records with a newline; a line without
+                # one was cut short even if what is there happens to parse.
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._intact_size += len(line)
+                if isinstance(record, dict):
+                    yield record
+
+    def repair(self) -> None:
+        """Cut the file back to the last intact record found by a complete :meth:`replay`.
+
+        A record appended after a torn line would otherwise be glued onto it,
+        and replay would stop there and drop it along with everything after.
+        """
+
+        if self._intact_size is not None and self.size() > self._intact_size:
+            os.truncate(self._path, self._intact_size)
+
+    def discard_through(self, seq: int) -> None:
+        """Drop records with a sequence number up to and including ``seq``."""
+
+        survivors = [record for record in self.replay() if isinstance(record.get("seq"), int) and record["seq"] > seq]
+        if not survivors:
+            self.truncate()
+            return
+        temp_path = self._path.with_name(self._path.name + ".tmp")
+        temp_path.unlink(missing_ok=True)
+        Journal(temp_path).append(survivors)
+        os.replace(temp_path, self._path)
+
+    def truncate(self) -> None:
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,72 @@
+"""Opening a store on a background thread for the GUI."""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Iterable, List, Sequence
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from .backends import open_store
+from .search import AccountIndex
+
+
+class StoreLoader(QThread):
+    """Opens the store at ``location`` and loads its services one by one.
+
+    :attr:`opened` carries the store as soon as it is open, before any
+    service has necessarily been decoded.  :attr:`service_ready` then names
+    each of ``services`` once it has been loaded, in order, except that
+    :meth:`prioritise` moves a service to the front of the queue.  Finally
+    ``indexes`` are attached, which needs every service, and
+    :attr:`indexed` is emitted.  If opening the store, decoding a service or
+    indexing fails, :attr:`failed` carries the error message and nothing
+    further is emitted.
+
+    The signals are delivered to slots on the GUI thread through queued
+    connections, so the store is never decoded on that thread.
+    """
+
+    opened = pyqtSignal(object)
+    service_ready = pyqtSignal(str)
+    indexed = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        location: str | Path | None,
+        services: Iterable[str],
+        indexes: Sequence[AccountIndex] = (),
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self._location = location
+        self._remaining: List[str] = list(services)
+        self._indexes = list(indexes)
+        self._queue_lock = threading.Lock()
+
+    def prioritise(self, service_name: str) -> None:
+        """Load ``service_name`` next if it has not been loaded yet."""
+
+        with self._queue_lock:
+            if service_name in self._remaining:
+                self._remaining.remove(service_name)
+                self._remaining.insert(0, service_name)
+
+    def _next_service(self) -> str | None:
+        with self._queue_lock:
+            return self._remaining.pop(0) if self._remaining else None
+
+    def run(self) -> None:
+        try:
+            store = open_store(self._location)
+            self.opened.emit(store)
+            while (service_name := self._next_service()) is not None:
+                store.get_service(service_name)
+                self.service_ready.emit(service_name)
+            for index in self._indexes:
+                store.attach_index(index)
+            self.indexed.emit()
+        except Exception as exc:  # the window would otherwise wait forever
+            self.failed.emit(f"Cannot open {self._location}: {exc}")
@@ -0,0 +1,207 @@
+"""Locks that protect stores from concurrent threads and processes."""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+class WriteConflictError(ValueError):
+    """Raised when unsaved changes cannot be merged with another process's commit.
+
+    ``rejected`` holds the journal records that were dropped: updates of
+    accounts that were deleted elsewhere, or additions that would duplicate a
+    username added elsewhere.  Every other pending change has been written.
+    """
+
+    def __init__(self, message: str, rejected: List[Dict[str, object]]) -> None:
+        super().__init__(message)
+        self.rejected = rejected
+
+
+ConflictListener = Callable[[WriteConflictError], None]
+
+
+class ReadWriteLock:
+    """Re-entrant lock that admits many readers or a single writer.
+
+    Writers are preferred: once a writer waits, new readers queue behind it,
+    so a stream of short reads cannot starve a write.  A thread holding the
+    write lock may also take the read lock, and either lock may be taken
+    again by the thread that holds it.  Upgrading a read lock to a write lock
+    would deadlock two readers trying it at once and raises ``RuntimeError``.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition(threading.Lock())
+        self._readers: Dict[int, int] = {}
+        self._writer: int | None = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self._condition:
+            # Re-entering must not queue behind a waiting writer, which would
+            # in turn be waiting for this thread.
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self) -> None:
+        me = threading.get_ident()
+        with self._condition:
+            depth = self._readers[me] - 1
+            if depth:
+                self._readers[me] = depth
+                return
+            del self._readers[me]
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            except BaseException:
+                self._waiting_writers -= 1
+                self._condition.notify_all()
+                raise
+            self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def is_writing(self) -> bool:
+        """Whether the calling thread holds the write lock."""
+
+        return self._writer == threading.get_ident()
+
+    def release_write(self) -> None:
+        with self._condition:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("write lock released by a thread that does not hold it")
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._condition.notify_all()
+
+
+class StoreLock:
+    """Advisory ``fcntl`` lock on ``<store>.lock``, which also holds the store version.
+
+    Every process writing the store takes the exclusive lock around the
+    write and bumps the version stored in the lock file, so a writer can
+    tell whether anyone else committed since it last read the store.  Where
+    ``fcntl`` is unavailable the lock only serialises threads of this
+    process and cannot protect against other processes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._fd: int | None = None
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def _descriptor(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        return self._fd
+
+    @contextmanager
+    def exclusive(self) -> Iterator["StoreLock"]:
+        with self._locked(fcntl.LOCK_EX if fcntl is not None else 0):
+            yield self
+
+    @contextmanager
+    def shared(self) -> Iterator["StoreLock"]:
+        with self._locked(fcntl.LOCK_SH if fcntl is not None else 0):
+            yield self
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        # Re-entrant within a thread: an inner unlock would release the outer
+        # lock, since flock() locks belong to the open file, not the caller.
+        with self._thread_lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            descriptor = self._descriptor()
+            if fcntl is not None:
+                fcntl.flock(descriptor, operation)
+            self._depth = 1
+            try:
+                yield
+            finally:
+                self._depth = 0
+                if fcntl is not None:
+                    fcntl.flock(descriptor, fcntl.LOCK_UN)
+
+    def read_version(self) -> int:
+        """Version last written to the lock file (0 for a new store)."""
+
+        # lseek() and read() rather than pread(), which Windows lacks; the
+        # thread lock keeps other threads from moving the offset meanwhile.
+        with self._thread_lock:
+            descriptor = self._descriptor()
+            os.lseek(descriptor, 0, os.SEEK_SET)
+            data = os.read(descriptor, 32)
+        try:
+            return int(data.decode("ascii").strip() or 0)
+        except ValueError:
+            return 0
+
+    def write_version(self, version: int) -> None:
+        """Record ``version``; call with the exclusive lock held."""
+
+        with self._thread_lock:
+            descriptor = self._descriptor()
+            os.ftruncate(descriptor, 0)
+            os.lseek(descriptor, 0, os.SEEK_SET)
+            os.write(descriptor, f"{version}\n".encode("ascii"))
+
+    def close(self) -> None:
+        with self._thread_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,121 @@
+"""Qt item models over store contents."""
+
+from __future__ import annotations
+
+from typing import List
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QObject, Qt
+
+from .backends import StorageBackend
+from .data_store import Account
+from .events import ChangeEvent, ChangeKind
+from .signals import StoreSignals
+
+
+def mask_password(password: str) -> str:
+    return "•" * len(password)
+
+
+class AccountTableModel(QAbstractTableModel):
+    """Username and (masked) password of every account in one service.
+
+    The model holds references to the store's own immutable accounts, in
+    the store's order, and formats a cell only when a view asks for it, so
+    no per-row objects exist for rows that are never painted.  Changes are
+    applied from the store's :class:`~.events.ChangeEvent` objects and
+    announced as single-row insertions, updates and removals, which lets
+    views keep their selection and scroll position.  Keeping its own list
+    rather than reading the store's live one means the model stays
+    consistent with what it announced even when events from another thread
+    arrive after the store has moved on.
+    """
+
+    COLUMNS = ("Username / Email", "Password")
+    AccountIdRole = Qt.ItemDataRole.UserRole
+
+    def __init__(
+        self,
+        service_name: str,
+        store: StorageBackend,
+        signals: StoreSignals,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self._service_name = service_name
+        self._store = store
+        self._accounts: List[Account] = []
+        self._generation = -1
+        signals.changed.connect(self._apply_change)
+        self.refresh()
+
+    @property
+    def service_name(self) -> str:
+        return self._service_name
+
+    def refresh(self) -> None:
+        """Re-read the service unless the model already shows its current generation."""
+
+        if self._store.service_generation(self._service_name) == self._generation:
+            return
+        # Copied together under the store lock, so that no event is both in
+        # the copy and newer than the generation it is recorded at.
+        accounts, generation = self._store.copy_service(self._service_name)
+        self.beginResetModel()
+        self._accounts = accounts
+        self._generation = generation
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._accounts)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> object:
+        if not index.isValid():
+            return None
+        account = self._accounts[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return account.username if index.column() == 0 else mask_password(account.password)
+        if role == self.AccountIdRole:
+            return account.id
+        return None
+
+    def headerData(
+        self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole
+    ) -> object:
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def account_at(self, row: int) -> Account | None:
+        return self._accounts[row] if 0 <= row < len(self._accounts) else None
+
+    def row_of(self, account_id: str) -> int:
+        for row, account in enumerate(self._accounts):
+            if account.id == account_id:
+                return row
+        return -1
+
+    def _apply_change(self, event: ChangeEvent) -> None:
+        # Events queued from another thread may predate the last refresh().
+        if event.service != self._service_name or event.generation <= self._generation:
+            return
+        if event.kind is ChangeKind.RESET or event.account is None:
+            self.refresh()
+            return
+        row = event.position
+        if event.kind is ChangeKind.ADDED:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._accounts.insert(row, event.account)
+            self._generation = event.generation
+            self.endInsertRows()
+        elif event.kind is ChangeKind.UPDATED:
+            self._accounts[row] = event.account
+            self._generation = event.generation
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+        elif event.kind is ChangeKind.REMOVED:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._accounts[row]
+            self._generation = event.generation
+            self.endRemoveRows()
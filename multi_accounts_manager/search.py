@@ -0,0 +1,273 @@
+"""Cross-service account search indexes kept in sync with a store."""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import heapq
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Protocol, Sequence, Set, Tuple
+
+from .data_store import Account, ServiceData, normalise_username
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    service: str
+    account: Account
+    score: float = 1.0
+
+
+class AccountIndex(Protocol):
+    """Derived index that a store keeps up to date as accounts change.
+
+    The store calls :meth:`rebuild` when the index is attached (and whenever
+    it reloads), then :meth:`add` and :meth:`remove` for every account that
+    enters or leaves it.  An update is a removal followed by an addition.
+    """
+
+    def rebuild(self, services: Mapping[str, ServiceData]) -> None: ...
+
+    def add(self, service_name: str, account: Account) -> None: ...
+
+    def remove(self, service_name: str, account: Account) -> None: ...
+
+
+class PrefixIndex:
+    """Username prefix index over every service, backed by a sorted array.
+
+    Entries are ``(normalised username, service, account id)`` tuples kept in
+    sorted order, so a prefix query is a binary search followed by a scan of
+    the matching run.  The index may be searched while the store updates it
+    from another thread.
+    """
+
+    def __init__(self) -> None:
+        self._entries: List[Tuple[str, str, str]] = []
+        self._accounts: Dict[str, Account] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, services: Mapping[str, ServiceData]) -> None:
+        accounts = {}
+        entries = []
+        for name, service in services.items():
+            for account in service.accounts:
+                entries.append((normalise_username(account.username), name, account.id))
+                accounts[account.id] = account
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._accounts = accounts
+
+    def add(self, service_name: str, account: Account) -> None:
+        with self._lock:
+            bisect.insort(self._entries, (normalise_username(account.username), service_name, account.id))
+            self._accounts[account.id] = account
+
+    def remove(self, service_name: str, account: Account) -> None:
+        entry = (normalise_username(account.username), service_name, account.id)
+        with self._lock:
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+                self._accounts.pop(account.id, None)
+
+    def search(self, prefix: str, limit: int | None = None) -> List[SearchResult]:
+        """Accounts whose username starts with ``prefix`` (case-insensitive)."""
+
+        key = normalise_username(prefix)
+        results: List[SearchResult] = []
+        with self._lock:
+            position = bisect.bisect_left(self._entries, (key,))
+            while position < len(self._entries) and (limit is None or len(results) < limit):
+                username, service_name, account_id = self._entries[position]
+                if not username.startswith(key):
+                    break
+                results.append(SearchResult(service_name, self._accounts[account_id]))
+                position += 1
+        return results
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Character trigrams of ``text``, padded so that word edges count too."""
+
+    padded = f"  {normalise_username(text)} "
+    return frozenset(padded[position : position + 3] for position in range(len(padded) - 2))
+
+
+def _similarity(query: FrozenSet[str], grams: FrozenSet[str]) -> float:
+    # Share of the query found in the text, so a misspelt fragment still
+    # matches a longer username ("jonathon.smith" in "jonathan.smith@...").
+    return len(query & grams) / len(query)
+
+
+class TrigramIndex:
+    """Typo-tolerant search over usernames and service names.
+
+    Each username is split into trigrams and every trigram keeps a postings
+    set of the accounts containing it.  A candidate's similarity is the
+    fraction of the query's trigrams it contains; equally similar candidates
+    are ranked shortest first, as they have less unmatched text.  Only
+    accounts that share enough trigrams with the query to reach
+    ``min_similarity`` are scored, and they are found by walking the rarest
+    postings lists first, so the common trigrams every address shares
+    (``"com"``) never turn a lookup into a scan of the whole vault.
+
+    Service names are matched the same way; every account of a matching
+    service is returned with the service's score unless its username scores
+    higher.  Each service keeps its accounts in ranking order, so a search
+    with a ``limit`` takes only the first ones rather than ranking the whole
+    service.  Like :class:`PrefixIndex`, the index may be searched while the
+    store updates it from another thread.
+    """
+
+    def __init__(self, min_similarity: float = 0.5) -> None:
+        self.min_similarity = min_similarity
+        self._postings: Dict[str, Set[str]] = {}
+        self._grams: Dict[str, FrozenSet[str]] = {}
+        self._accounts: Dict[str, Tuple[str, Account]] = {}
+        # Per service, ``(trigram count, username, account id)`` in ranking order.
+        self._services: Dict[str, List[Tuple[int, str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def rebuild(self, services: Mapping[str, ServiceData]) -> None:
+        with self._lock:
+            self._postings = {}
+            self._grams = {}
+            self._accounts = {}
+            self._services = {}
+            for name, service in services.items():
+                self._services[name] = sorted(self._add(name, account) for account in service.accounts)
+
+    def add(self, service_name: str, account: Account) -> None:
+        with self._lock:
+            bisect.insort(self._services.setdefault(service_name, []), self._add(service_name, account))
+
+    def _add(self, service_name: str, account: Account) -> Tuple[int, str, str]:
+        """Index ``account`` everywhere but in its service's order; return its entry there."""
+
+        grams = trigrams(account.username)
+        self._grams[account.id] = grams
+        self._accounts[account.id] = (service_name, account)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(account.id)
+        return (len(grams), account.username, account.id)
+
+    def remove(self, service_name: str, account: Account) -> None:
+        with self._lock:
+            grams = self._grams.pop(account.id, None)
+            if grams is None:
+                return
+            stored_service, stored = self._accounts.pop(account.id)
+            order = self._services.get(stored_service, [])
+            entry = (len(grams), stored.username, stored.id)
+            position = bisect.bisect_left(order, entry)
+            if position < len(order) and order[position] == entry:
+                del order[position]
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(account.id)
+                    if not postings:
+                        del self._postings[gram]
+
+    def search(self, text: str, limit: int | None = 20) -> List[SearchResult]:
+        """Accounts similar to ``text``, best match first."""
+
+        with self._lock:
+            return self._search(trigrams(text), limit)
+
+    def _search(self, query: FrozenSet[str], limit: int | None) -> List[SearchResult]:
+        service_scores: Dict[str, float] = {}
+        for service_name in self._services:
+            score = _similarity(query, trigrams(service_name))
+            if score >= self.min_similarity:
+                service_scores[service_name] = score
+        # Each matching service guarantees this many results at its score.
+        # Accounts whose username beats their service's score are not added
+        # to ``best`` as well, so that no account is counted twice.
+        seeds = (
+            score for name, score in service_scores.items() for _ in range(min(limit or 0, len(self._services[name])))
+        )
+        best = heapq.nlargest(limit, seeds) if limit is not None else []
+        heapq.heapify(best)
+        # Postings are walked rarest first.  An account missing from the first
+        # ``walked`` lists shares at most ``len(query) - walked`` trigrams with
+        # the query, which caps its similarity; once that cap drops below the
+        # threshold (or below the worst of ``limit`` results already found)
+        # the remaining, more common lists cannot contribute anything.
+        scores: Dict[str, float] = {}
+        rarest = sorted(query, key=lambda gram: len(self._postings.get(gram, ())))
+        for walked, gram in enumerate(rarest):
+            floor = best[0] if limit is not None and len(best) >= limit else 0.0
+            if (len(query) - walked) / len(query) < max(self.min_similarity, floor):
+                break
+            for account_id in self._postings.get(gram, ()):
+                if account_id in scores:
+                    continue
+                score = _similarity(query, self._grams[account_id])
+                service_score = service_scores.get(self._accounts[account_id][0])
+                if score < self.min_similarity or (service_score is not None and score <= service_score):
+                    scores[account_id] = 0.0
+                    continue
+                scores[account_id] = score
+                if limit is not None and service_score is None:
+                    if len(best) < limit:
+                        heapq.heappush(best, score)
+                    elif score > best[0]:
+                        heapq.heapreplace(best, score)
+        candidates = [(account_id, score) for account_id, score in scores.items() if score]
+        # The rest of a matching service ranks in its stored order, so only
+        # its first ``limit`` accounts not already ranked by username can win.
+        for service_name, score in service_scores.items():
+            taken = 0
+            for _, _, account_id in self._services[service_name]:
+                if limit is not None and taken >= limit:
+                    break
+                if not scores.get(account_id):
+                    candidates.append((account_id, score))
+                    taken += 1
+        ranked = sorted(
+            candidates,
+            key=lambda item: (-item[1], len(self._grams[item[0]]), self._accounts[item[0]][1].username),
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [SearchResult(*self._accounts[account_id], score) for account_id, score in ranked]
+
+
+def _format_results(results: Iterable[SearchResult]) -> List[str]:
+    return [f"{result.service}\t{result.account.username}\t{result.score:.2f}" for result in results]
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Print accounts whose username starts with (or, with ``--fuzzy``, resembles) a query."""
+
+    from .backends import open_store
+
+    parser = argparse.ArgumentParser(prog="python -m multi_accounts_manager.search")
+    parser.add_argument("storage", help="storage path or backend URL")
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--fuzzy", action="store_true", help="rank by trigram similarity instead of prefix")
+    arguments = parser.parse_args(argv)
+
+    store = open_store(arguments.storage)
+    try:
+        index: PrefixIndex | TrigramIndex = TrigramIndex() if arguments.fuzzy else PrefixIndex()
+        store.attach_index(index)
+        for line in _format_results(index.search(arguments.query, arguments.limit)):
+            print(line)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Directory-based storage with one JSON shard per service."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from .data_store import JOURNAL_SEQ_KEY, DataStore, ServiceData, SnapshotState, _write_atomic
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def shard_stem(service_name: str) -> str:
+    """File-system safe, collision free stem for a service's shard files."""
+
+    slug = re.sub(r"[^a-z0-9]+", "-", service_name.lower()).strip("-") or "service"
+    digest = hashlib.sha1(service_name.encode("utf-8")).hexdigest()[:8]
+    return f"{slug}-{digest}"
+
+
+class ShardedDataStore(DataStore):
+    """:class:`~.data_store.DataStore` that keeps each service in its own file.
+
+    ``storage_path`` is a directory holding a ``manifest.json`` and one shard
+    per service.  Saving only rewrites the shards of services that changed
+    since the previous snapshot.  Shards are written under a fresh file name
+    and the manifest is swapped in last, so a crash part-way through a save
+    leaves the previous snapshot intact.  Loading reads the shards on
+    ``max_workers`` threads, or, with ``lazy=True``, only reads a shard the
+    first time its service is accessed.
+
+    All other options (journal, compaction, autosave) behave as for
+    :class:`~.data_store.DataStore`.
+    """
+
+    def __init__(self, storage_path: Path, *, max_workers: int = 4, **options: object) -> None:
+        self._max_workers = max_workers
+        self._shard_files: Dict[str, str] = {}
+        self._shard_generation = 0
+        super().__init__(storage_path, **options)
+
+    @property
+    def manifest_path(self) -> Path:
+        return self._storage_path / MANIFEST_NAME
+
+    def _read_snapshot(self) -> None:
+        self._shard_files = {}
+        self._shard_generation = 0
+        try:
+            with self.manifest_path.open("r", encoding="utf-8") as handle:
+                manifest = json.load(handle)
+        except (OSError, ValueError):
+            return
+        if not isinstance(manifest, dict) or not isinstance(manifest.get("services"), dict):
+            return
+        self._shard_files = {str(name): str(file_name) for name, file_name in manifest["services"].items()}
+        generation = manifest.get("generation", 0)
+        self._shard_generation = generation if isinstance(generation, int) else 0
+        seq = manifest.get(JOURNAL_SEQ_KEY, 0)
+        self._journal_seq = seq if isinstance(seq, int) else 0
+        names = list(self._shard_files)
+        if self._lazy:
+            self._unloaded = {name: None for name in names}
+            return
+        with ThreadPoolExecutor(max_workers=max(1, self._max_workers)) as executor:
+            shards = list(executor.map(self._read_shard, names))
+        self._services = {name: shard for name, shard in zip(names, shards)}
+
+    def _materialise(self, service_name: str, handle: object) -> ServiceData:
+        return self._read_shard(service_name)
+
+    def _read_shard(self, service_name: str) -> ServiceData:
+        try:
+            with (self._storage_path / self._shard_files[service_name]).open("r", encoding="utf-8") as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError):
+            return ServiceData(name=service_name)
+        if not isinstance(payload, dict):
+            return ServiceData(name=service_name)
+        return ServiceData.from_dict({**payload, "name": service_name})
+
+    def _prepare_snapshot(self, state: SnapshotState) -> Callable[[], None]:
+        self._storage_path.mkdir(parents=True, exist_ok=True)
+        generation = self._shard_generation + 1
+        shard_files = {
+            name: file_name
+            for name, file_name in self._shard_files.items()
+            if name in state.services or name in state.unloaded
+        }
+        for name, accounts in state.services.items():
+            if name in shard_files and name not in state.changed:
+                continue
+            shard_path = self._storage_path / f"{shard_stem(name)}.{generation}.json"
+            text = json.dumps({"accounts": [account.to_dict() for account in accounts]}, indent=2)
+            _write_atomic(shard_path, text)
+            shard_files[name] = shard_path.name
+        manifest: Dict[str, object] = {
+            "version": MANIFEST_VERSION,
+            "generation": generation,
+            "services": shard_files,
+        }
+        if self._journal is not None:
+            manifest[JOURNAL_SEQ_KEY] = state.seq
+        manifest_temp = _write_atomic(self.manifest_path, json.dumps(manifest, indent=2), replace=False)
+
+        def publish() -> None:
+            os.replace(manifest_temp, self.manifest_path)
+            stale = set(self._shard_files.values()) - set(shard_files.values())
+            self._shard_files = shard_files
+            self._shard_generation = generation
+            for file_name in stale:
+                (self._storage_path / file_name).unlink(missing_ok=True)
+
+        return publish
+
+    def watched_paths(self) -> List[Path]:
+        # Shards are written before the manifest that refers to them.
+        return [self.manifest_path, *super().watched_paths()[1:]]
+
+    def _unchanged_on_disk(self, service_name: str, shadow: DataStore) -> bool:
+        assert isinstance(shadow, ShardedDataStore)
+        file_name = self._shard_files.get(service_name)
+        return file_name is not None and file_name == shadow._shard_files.get(service_name)
+
+    def _adopt_disk_state(self, shadow: DataStore) -> None:
+        assert isinstance(shadow, ShardedDataStore)
+        self._shard_files = shadow._shard_files
+        self._shard_generation = shadow._shard_generation
+
+    def shard_path(self, service_name: str) -> Path | None:
+        file_name = self._shard_files.get(service_name)
+        return self._storage_path / file_name if file_name else None
+
@@ -0,0 +1,32 @@
+"""Qt adapter for store change events and write conflicts."""
+
+from __future__ import annotations
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .backends import StorageBackend
+
+
+class StoreSignals(QObject):
+    """Re-emits a store's :class:`~.events.ChangeEvent` objects as a Qt signal.
+
+    Slots connected to :attr:`changed` run on their object's thread, so
+    changes made by a background thread are delivered to widgets on the GUI
+    thread through Qt's queued connections.  :attr:`conflicted` likewise
+    carries every :class:`~.locking.WriteConflictError` the store's writes
+    run into, including those of its autosave and compaction threads.
+    """
+
+    changed = pyqtSignal(object)
+    conflicted = pyqtSignal(object)
+
+    def __init__(self, store: StorageBackend, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._unsubscribe = store.subscribe(self.changed.emit)
+        self._unsubscribe_conflicts = store.subscribe_conflicts(self.conflicted.emit)
+
+    def detach(self) -> None:
+        """Stop forwarding the store's events."""
+
+        self._unsubscribe()
+        self._unsubscribe_conflicts()
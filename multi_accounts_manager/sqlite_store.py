@@ -0,0 +1,418 @@
+"""SQLite persistence backend for large vaults."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Set, Tuple
+
+from .data_store import Account, DataStore, DuplicateAccountError, ServiceData, new_account_id, normalise_username
+from .events import ChangeEvent, ChangeKind, ChangeListener, ChangeNotifier
+from .locking import ConflictListener
+from .views import AccountsView, ServicesView
+
+if TYPE_CHECKING:
+    from .search import AccountIndex
+
+DEFAULT_SQLITE_FILE = Path.home() / ".multi_accounts_manager.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    name TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service TEXT NOT NULL,
+    username TEXT NOT NULL,
+    password TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS accounts_by_service ON accounts (service, id);
+CREATE INDEX IF NOT EXISTS accounts_by_username ON accounts (service, username);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Applied in order on top of ``_SCHEMA``; ``PRAGMA user_version`` records how
+# many have run.
+_MIGRATIONS: Tuple[str, ...] = (
+    """
+    ALTER TABLE accounts ADD COLUMN uid TEXT;
+    UPDATE accounts SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL;
+    CREATE UNIQUE INDEX IF NOT EXISTS accounts_by_uid ON accounts (uid);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS accounts_by_username_nocase ON accounts (service, username COLLATE NOCASE);
+    """,
+)
+
+
+class SqliteDataStore:
+    """Account storage backed by an SQLite database in WAL mode.
+
+    The public surface mirrors :class:`~.data_store.DataStore`, but each
+    mutation only touches the affected row instead of re-serialising the whole
+    vault.  Accounts keep their insertion order, so the positional ``index``
+    arguments mean the same thing as for the JSON store.
+
+    Username lookups use SQLite's ``NOCASE`` collation, which only folds
+    ASCII letters; ``unique_usernames`` behaves as for the JSON store.
+
+    When ``migrate_from`` points at an existing JSON store (including its
+    journal, if any) and the database has not been migrated yet, its contents
+    are imported once in a single transaction.
+
+    Views returned by :meth:`list_accounts` and :meth:`all_services` hold the
+    rows read for them; generations are tracked per process, so changes made
+    to the database by another process do not make them stale.
+    """
+
+    def __init__(
+        self,
+        storage_path: Path | None = None,
+        *,
+        migrate_from: Path | None = None,
+        unique_usernames: bool = False,
+    ) -> None:
+        self._storage_path = Path(storage_path or DEFAULT_SQLITE_FILE)
+        self._unique_usernames = unique_usernames
+        self._storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._indexes: List["AccountIndex"] = []
+        self._generation = 0
+        self._generations: Dict[str, int] = {}
+        self._base_generation = 0
+        self._notifier = ChangeNotifier()
+        self._connection = sqlite3.connect(str(self._storage_path), isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        self._upgrade_schema()
+        if migrate_from is not None:
+            self.migrate_json(Path(migrate_from))
+
+    @property
+    def storage_path(self) -> Path:
+        return self._storage_path
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def service_generation(self, service_name: str) -> int:
+        return self._generations.get(service_name, self._base_generation)
+
+    def _bump(self, service_name: str) -> None:
+        self._generation += 1
+        self._generations[service_name] = self._generation
+
+    def _upgrade_schema(self) -> None:
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        for index, script in enumerate(_MIGRATIONS[version:], start=version + 1):
+            self._connection.executescript(f"BEGIN; {script} PRAGMA user_version = {index}; COMMIT;")
+
+    def migrate_json(self, json_path: Path) -> bool:
+        """Import a JSON store once; return ``True`` if anything was imported."""
+
+        journal_path = json_path.with_name(json_path.name + ".journal")
+        if not (json_path.exists() or journal_path.exists()) or self._meta("migrated_from") is not None:
+            return False
+        # Only read here: no lock file is left next to the JSON store, and
+        # close() releases the store before the method returns.
+        source = DataStore(json_path, journal=journal_path.exists(), locking=False)
+        try:
+            with self.batch():
+                for name, service in source.all_services().items():
+                    self._ensure_service(name)
+                    self._insert(name, service.accounts)
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)", (str(json_path),)
+                )
+        finally:
+            source.close()
+        return True
+
+    def load(self) -> None:
+        """Present for interface parity; the database is always current."""
+
+    def save(self) -> None:
+        with self._lock:
+            self._connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def flush(self) -> None:
+        """Present for interface parity; every mutation is committed directly."""
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    @contextmanager
+    def batch(self) -> Iterator["SqliteDataStore"]:
+        """Run the enclosed mutations in one SQLite transaction."""
+
+        with self._lock:
+            if self._batch_depth:
+                self._batch_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._batch_depth -= 1
+                return
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._batch_depth = 1
+            self._notifier.hold()
+            try:
+                yield self
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                self._generation += 1
+                self._base_generation = self._generation
+                self._generations = {}
+                self._rebuild_indexes()
+                self._notifier.release(deliver=False)
+                raise
+            else:
+                self._connection.execute("COMMIT")
+                self._notifier.release()
+            finally:
+                self._batch_depth = 0
+
+    def subscribe(self, listener: ChangeListener) -> Callable[[], None]:
+        """See :meth:`.DataStore.subscribe`."""
+
+        return self._notifier.subscribe(listener)
+
+    def subscribe_conflicts(self, listener: ConflictListener) -> Callable[[], None]:
+        """Present for interface parity; SQLite serialises writers, so writes never conflict."""
+
+        return lambda: None
+
+    def attach_index(self, index: "AccountIndex") -> None:
+        """Build ``index`` from the database and keep it in sync from now on."""
+
+        with self._lock:
+            self._indexes.append(index)
+            index.rebuild(self.all_services())
+
+    def detach_index(self, index: "AccountIndex") -> None:
+        with self._lock:
+            self._indexes.remove(index)
+
+    def _rebuild_indexes(self) -> None:
+        if self._indexes:
+            services = self.all_services()
+            for index in self._indexes:
+                index.rebuild(services)
+
+    def _notify_changed(self, service_name: str, removed: List[Account], added: List[Account]) -> None:
+        self._bump(service_name)
+        for index in self._indexes:
+            for account in removed:
+                index.remove(service_name, account)
+            for account in added:
+                index.add(service_name, account)
+
+    def _emit(self, kind: ChangeKind, service_name: str, row_id: int, account: Account) -> None:
+        if self._notifier.has_listeners:
+            position = self._row_position(service_name, row_id)
+            self._notifier.emit(
+                ChangeEvent(kind, service_name, account.id, position, account, self.service_generation(service_name))
+            )
+
+    def _row_position(self, service_name: str, row_id: int) -> int:
+        (position,) = self._connection.execute(
+            "SELECT COUNT(*) FROM accounts WHERE service = ? AND id < ?", (service_name, row_id)
+        ).fetchone()
+        return position
+
+    def get_service(self, service_name: str) -> ServiceData:
+        """Return a detached copy of the service; change it through the store."""
+
+        with self._lock:
+            self._ensure_service(service_name)
+            return ServiceData(name=service_name, accounts=list(self.list_accounts(service_name)))
+
+    def set_accounts(self, service_name: str, accounts: List[Account]) -> None:
+        accounts = list(accounts)
+        if self._unique_usernames:
+            keys = {normalise_username(account.username) for account in accounts}
+            if len(keys) != len(accounts):
+                raise DuplicateAccountError(f"Duplicate usernames in accounts for {service_name}")
+        with self.batch():
+            self._ensure_service(service_name)
+            previous = list(self.list_accounts(service_name)) if self._indexes else []
+            self._connection.execute("DELETE FROM accounts WHERE service = ?", (service_name,))
+            accounts = self._with_free_ids(accounts)
+            self._insert(service_name, accounts)
+            self._notify_changed(service_name, previous, accounts)
+            generation = self.service_generation(service_name)
+            self._notifier.emit(ChangeEvent(ChangeKind.RESET, service_name, generation=generation))
+
+    def add_account(self, service_name: str, account: Account) -> None:
+        with self.batch():
+            self._check_unique(service_name, account.username)
+            self._ensure_service(service_name)
+            (account,) = self._with_free_ids([account])
+            row_id = self._insert(service_name, [account])
+            self._notify_changed(service_name, [], [account])
+            self._emit(ChangeKind.ADDED, service_name, row_id, account)
+
+    def update_account(self, service_name: str, index: int, account: Account) -> None:
+        """Replace the account at ``index``; the stored account keeps its id."""
+
+        with self._lock:
+            row_id = self._row_id(service_name, index)
+            if row_id is not None:
+                self._check_unique(service_name, account.username, row_id)
+                self._update_row(row_id, service_name, account)
+
+    def delete_account(self, service_name: str, index: int) -> None:
+        with self._lock:
+            row_id = self._row_id(service_name, index)
+            if row_id is not None:
+                self._delete_row(row_id, service_name)
+
+    def get_account(self, account_id: str) -> Account | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT username, password, uid FROM accounts WHERE uid = ?", (account_id,)
+            ).fetchone()
+            return Account(*row) if row else None
+
+    def update_account_by_id(self, account_id: str, account: Account) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, service FROM accounts WHERE uid = ?", (account_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            self._check_unique(row[1], account.username, row[0])
+            self._update_row(row[0], row[1], account)
+            return True
+
+    def find_account(self, service_name: str, username: str) -> Account | None:
+        with self._lock:
+            row = self._find_row(service_name, username)
+            return Account(*row[1:]) if row else None
+
+    def _find_row(self, service_name: str, username: str) -> Tuple[int, str, str, str] | None:
+        return self._connection.execute(
+            "SELECT id, username, password, uid FROM accounts"
+            " WHERE service = ? AND username = ? COLLATE NOCASE ORDER BY id LIMIT 1",
+            (service_name, username.strip()),
+        ).fetchone()
+
+    def _check_unique(self, service_name: str, username: str, row_id: int | None = None) -> None:
+        if not self._unique_usernames:
+            return
+        rows = self._connection.execute(
+            "SELECT id FROM accounts WHERE service = ? AND username = ? COLLATE NOCASE",
+            (service_name, username.strip()),
+        )
+        matches = {match for (match,) in rows}
+        if matches and row_id not in matches:
+            raise DuplicateAccountError(f"{username!r} already exists in {service_name}")
+
+    def delete_account_by_id(self, account_id: str) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, service FROM accounts WHERE uid = ?", (account_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            self._delete_row(*row)
+            return True
+
+    def list_accounts(self, service_name: str) -> AccountsView:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT username, password, uid FROM accounts WHERE service = ? ORDER BY id", (service_name,)
+            )
+            return AccountsView(
+                [Account(*row) for row in rows],
+                self.service_generation(service_name),
+                lambda: self.service_generation(service_name),
+            )
+
+    def all_services(self) -> ServicesView:
+        with self._lock:
+            services = {
+                name: ServiceData(name=name) for (name,) in self._connection.execute("SELECT name FROM services")
+            }
+            rows = self._connection.execute("SELECT service, username, password, uid FROM accounts ORDER BY id")
+            for service_name, username, password, uid in rows:
+                service = services.setdefault(service_name, ServiceData(name=service_name))
+                service.accounts.append(Account(username, password, uid))
+            return ServicesView(services, self._generation, lambda: self._generation)
+
+    def copy_accounts(self) -> Dict[str, List[Account]]:
+        return {name: list(service.accounts) for name, service in self.all_services().items()}
+
+    def copy_service(self, service_name: str) -> Tuple[List[Account], int]:
+        # list_accounts() already reads the rows and the generation under the lock.
+        accounts = self.list_accounts(service_name)
+        return list(accounts), accounts.generation
+
+    def _with_free_ids(self, accounts: List[Account]) -> List[Account]:
+        """Give accounts whose id is already stored, or repeated, a new one."""
+
+        seen: Set[str] = set()
+        result = []
+        for account in accounts:
+            stored = self._connection.execute("SELECT 1 FROM accounts WHERE uid = ?", (account.id,)).fetchone()
+            if stored is not None or account.id in seen:
+                account = replace(account, id=new_account_id())
+            seen.add(account.id)
+            result.append(account)
+        return result
+
+    def _insert(self, service_name: str, accounts: List[Account]) -> int:
+        """Insert ``accounts`` and return the row id of the last one."""
+
+        self._connection.executemany(
+            "INSERT INTO accounts (service, username, password, uid) VALUES (?, ?, ?, ?)",
+            [(service_name, account.username, account.password, account.id) for account in accounts],
+        )
+        (row_id,) = self._connection.execute("SELECT last_insert_rowid()").fetchone()
+        return row_id
+
+    def _row_account(self, row_id: int) -> Account:
+        row = self._connection.execute("SELECT username, password, uid FROM accounts WHERE id = ?", (row_id,))
+        return Account(*row.fetchone())
+
+    def _update_row(self, row_id: int, service_name: str, account: Account) -> None:
+        previous = self._row_account(row_id)
+        self._connection.execute(
+            "UPDATE accounts SET username = ?, password = ? WHERE id = ?",
+            (account.username, account.password, row_id),
+        )
+        stored = Account(account.username, account.password, previous.id)
+        self._notify_changed(service_name, [previous], [stored])
+        self._emit(ChangeKind.UPDATED, service_name, row_id, stored)
+
+    def _delete_row(self, row_id: int, service_name: str) -> None:
+        previous = self._row_account(row_id)
+        # Rows are ordered by id, so the position is unaffected by the delete.
+        self._connection.execute("DELETE FROM accounts WHERE id = ?", (row_id,))
+        self._notify_changed(service_name, [previous], [])
+        self._emit(ChangeKind.REMOVED, service_name, row_id, previous)
+
+    def _ensure_service(self, service_name: str) -> None:
+        self._connection.execute("INSERT OR IGNORE INTO services (name) VALUES (?)", (service_name,))
+
+    def _row_id(self, service_name: str, index: int) -> int | None:
+        if index < 0:
+            return None
+        row = self._connection.execute(
+            "SELECT id FROM accounts WHERE service = ? ORDER BY id LIMIT 1 OFFSET ?", (service_name, index)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _meta(self, key: str) -> str | None:
+        row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
@@ -0,0 +1,91 @@
+"""Read-only views over store contents that know when they went stale."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Mapping, Sequence, overload
+
+if TYPE_CHECKING:
+    from .data_store import Account, ServiceData
+
+
+class AccountsView(Sequence["Account"]):
+    """Read-only view of one service's accounts, without copying them.
+
+    The view reads the store's live list, so it always reflects the current
+    accounts of the service as long as it is not :attr:`stale`.
+    ``generation`` is the service's generation when the view was taken; once
+    the service is mutated (or replaced, e.g. by a reload) :attr:`stale`
+    becomes ``True`` and callers that cached something derived from the view
+    should ask the store for a new one.
+    """
+
+    __slots__ = ("_accounts", "_generation", "_current")
+
+    def __init__(self, accounts: Sequence[Account], generation: int, current: Callable[[], int]) -> None:
+        self._accounts = accounts
+        self._generation = generation
+        self._current = current
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def stale(self) -> bool:
+        return self._current() != self._generation
+
+    @overload
+    def __getitem__(self, index: int) -> Account: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Account]: ...
+
+    def __getitem__(self, index: int | slice) -> Account | List[Account]:
+        return self._accounts[index]
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def __iter__(self) -> Iterator[Account]:
+        return iter(self._accounts)
+
+    def __repr__(self) -> str:
+        return f"AccountsView({len(self._accounts)} accounts, generation={self._generation})"
+
+
+class ServicesView(Mapping[str, "ServiceData"]):
+    """Read-only view of every service of a store, without copying the mapping.
+
+    ``generation`` is the store-wide generation when the view was taken and
+    :attr:`stale` turns ``True`` after any mutation of the store.  Services
+    added while the view is being iterated make the iteration fail, as for a
+    plain dict.
+    """
+
+    __slots__ = ("_services", "_generation", "_current")
+
+    def __init__(self, services: Dict[str, ServiceData], generation: int, current: Callable[[], int]) -> None:
+        self._services = services
+        self._generation = generation
+        self._current = current
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def stale(self) -> bool:
+        return self._current() != self._generation
+
+    def __getitem__(self, name: str) -> ServiceData:
+        return self._services[name]
+
+    def __len__(self) -> int:
+        return len(self._services)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._services)
+
+    def __repr__(self) -> str:
+        return f"ServicesView({list(self._services)}, generation={self._generation})"
+
@@ -0,0 +1,177 @@
+"""Detection of changes made to a store's files by other processes."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import hashlib
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Tuple
+
+if TYPE_CHECKING:
+    from .data_store import DataStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WatchPolicy:
+    """How often a store checks its files for changes made by someone else.
+
+    The files are polled every ``interval`` seconds.  With ``use_inotify``
+    (and on Linux) the watcher additionally wakes up as soon as the storage
+    directory changes, waiting ``settle`` seconds for the writer to finish.
+    """
+
+    interval: float = 2.0
+    use_inotify: bool = True
+    settle: float = 0.1
+
+
+class FileSignature(NamedTuple):
+    """What a file looked like when it was last read or written."""
+
+    mtime_ns: int
+    size: int
+    digest: str
+
+
+def file_signature(path: Path, previous: FileSignature | None = None) -> FileSignature | None:
+    """Signature of ``path``, or ``None`` if it does not exist.
+
+    The content is only hashed when the modification time or size differ
+    from ``previous``, which is returned unchanged otherwise.
+    """
+
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    if previous is not None and (previous.mtime_ns, previous.size) == (stat.st_mtime_ns, stat.st_size):
+        return previous
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with path.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return FileSignature(stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+
+
+class _Inotify:
+    """Minimal ``inotify`` binding used to wake the watcher early."""
+
+    _MASK = 0x00000008 | 0x00000080 | 0x00000100 | 0x00000200  # CLOSE_WRITE, MOVED_TO, CREATE, DELETE
+    _NONBLOCK_CLOEXEC = os.O_NONBLOCK | os.O_CLOEXEC
+
+    def __init__(self, directories: Iterable[Path]) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(self._NONBLOCK_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        for directory in directories:
+            if libc.inotify_add_watch(self._fd, os.fsencode(directory), self._MASK) < 0:
+                os.close(self._fd)
+                raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def drain(self) -> None:
+        try:
+            while os.read(self._fd, 64 * (struct.calcsize("iIII") + 256)):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class ChangeWatcher:
+    """Daemon thread that reloads a store when its files change on disk.
+
+    Every check goes through :meth:`~.data_store.DataStore.reload_if_changed`,
+    which compares the files against what the store itself last read or
+    wrote and reloads only the services that differ.
+    """
+
+    def __init__(self, store: "DataStore", policy: WatchPolicy | None = None) -> None:
+        self._store = store
+        self._policy = policy or WatchPolicy()
+        self._stopped = threading.Event()
+        # Wakes a select() on inotify when stopping; only created alongside it,
+        # since select() on a pipe does not work on Windows.
+        self._wake: Tuple[int, int] | None = None
+        self._inotify: _Inotify | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def policy(self) -> WatchPolicy:
+        return self._policy
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self._policy.use_inotify and sys.platform.startswith("linux"):
+            directories = {path.parent for path in self._store.watched_paths()}
+            try:
+                self._inotify = _Inotify(directories)
+                self._wake = os.pipe()
+            except (OSError, AttributeError):
+                logger.debug("inotify unavailable; polling %s", self._store.storage_path)
+        self._thread = threading.Thread(target=self._run, name="store-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._wake is not None:
+            os.write(self._wake[1], b"\0")
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        if self._wake is not None:
+            for descriptor in self._wake:
+                os.close(descriptor)
+            self._wake = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wait()
+            if self._stopped.is_set():
+                return
+            try:
+                self._store.reload_if_changed()
+            except OSError:
+                logger.exception("Checking %s for external changes failed", self._store.storage_path)
+
+    def _wait(self) -> None:
+        if self._inotify is None or self._wake is None:
+            self._stopped.wait(self._policy.interval)
+            return
+        try:
+            ready, _, _ = select.select([self._wake[0], self._inotify.fileno()], [], [], self._policy.interval)
+        except OSError:
+            logger.exception("Waiting for changes to %s failed; polling instead", self._store.storage_path)
+            self._inotify.close()
+            self._inotify = None
+            return
+        if self._inotify.fileno() in ready:
+            # Let the writer finish (e.g. rename its temporary file) first.
+            self._stopped.wait(self._policy.settle)
+            self._inotify.drain()
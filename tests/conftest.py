@@ -0,0 +1,12 @@
+import pytest
+
+
+def _usernames(store, service_name):
+    return [account.username for account in store.list_accounts(service_name)]
+
+
+@pytest.fixture
+def usernames():
+    """Return a helper listing a service's usernames in order."""
+
+    return _usernames
@@ -0,0 +1,40 @@
+import asyncio
+
+from multi_accounts_manager.async_store import AsyncDataStore
+from multi_accounts_manager.data_store import Account, DataStore, DuplicateAccountError
+
+
+def test_concurrent_mutations_are_written_once(tmp_path, usernames):
+    store = DataStore(tmp_path / "vault.json", journal=True)
+
+    async def main():
+        front = AsyncDataStore(store)
+        await asyncio.gather(
+            *(front.add_account("Gmail", Account(username=f"user{i}", password="x")) for i in range(50))
+        )
+
+    asyncio.run(main())
+    assert store.write_stats.count == 1
+    assert usernames(store, "Gmail") == [f"user{i}" for i in range(50)]
+    store.close()
+    assert len(DataStore(tmp_path / "vault.json", journal=True).list_accounts("Gmail")) == 50
+
+
+def test_a_failing_mutation_fails_only_its_caller(tmp_path, usernames):
+    store = DataStore(tmp_path / "vault.json", unique_usernames=True)
+    store.add_account("Gmail", Account(username="bob", password="x"))
+    writes = store.write_stats.count
+
+    async def main():
+        front = AsyncDataStore(store)
+        return await asyncio.gather(
+            *(front.add_account("Gmail", Account(username=name, password="y")) for name in ("alice", "BOB", "carol")),
+            return_exceptions=True,
+        )
+
+    first, duplicate, last = asyncio.run(main())
+    assert first is None and last is None
+    assert isinstance(duplicate, DuplicateAccountError)
+    assert store.write_stats.count == writes + 1
+    assert usernames(store, "Gmail") == ["bob", "alice", "carol"]
+    store.close()
@@ -0,0 +1,16 @@
+from multi_accounts_manager.cache import VersionedCache
+
+
+def test_capacity_bounds_the_cached_weight():
+    versions = {"a": 1, "b": 1}
+    cache = VersionedCache(versions.__getitem__, capacity=5, weigh=len)
+
+    assert cache.get("a", lambda: "aaaa") == "aaaa"
+    assert cache.get("b", lambda: "bbbb") == "bbbb"
+    assert cache.is_fresh("a") and not cache.is_fresh("b")
+    assert cache.weight == 4
+
+    versions["a"] = 2
+    assert cache.get("a", lambda: "a") == "a"
+    assert cache.get("b", lambda: "bbbb") == "bbbb"
+    assert cache.is_fresh("b") and cache.weight == 5
@@ -0,0 +1,106 @@
+import json
+import random
+
+import pytest
+
+from multi_accounts_manager.data_store import Account, DataStore, DuplicateAccountError
+from multi_accounts_manager.search import PrefixIndex
+
+
+def test_ids_locate_accounts_after_deletes_and_appends(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    store.set_accounts("Gmail", [Account(username=f"user{i}", password="x") for i in range(500)])
+    accounts = list(store.list_accounts("Gmail"))
+    rng = random.Random(0)
+    with store.batch():
+        for step, account in enumerate(rng.sample(accounts, 300)):
+            assert store.delete_account_by_id(account.id)
+            if step % 5 == 0:
+                store.add_account("Gmail", Account(username=f"new{step}", password="x"))
+            probe = rng.choice(store.list_accounts("Gmail"))
+            assert store.get_account(probe.id) is probe
+    for position, account in enumerate(store.list_accounts("Gmail")):
+        assert store.locate(account.id) == ("Gmail", position)
+
+
+def test_existing_case_duplicates_can_still_be_edited(tmp_path):
+    path = tmp_path / "vault.json"
+    legacy = DataStore(path)
+    legacy.set_accounts("Gmail", [Account(username="Bob", password="1"), Account(username="bob", password="2")])
+    legacy.close()
+
+    store = DataStore(path, unique_usernames=True)
+    second = store.list_accounts("Gmail")[1]
+    assert store.update_account_by_id(second.id, Account(username="bob", password="3"))
+    with pytest.raises(DuplicateAccountError):
+        store.add_account("Gmail", Account(username="BOB", password="4"))
+
+
+def test_rollback_restores_accounts_and_indexes(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    store.set_accounts("Gmail", [Account(username=f"user{i}", password="x") for i in range(20)])
+    store.set_accounts("Yandex", [Account(username="other", password="x")])
+    index = PrefixIndex()
+    store.attach_index(index)
+    removed = store.list_accounts("Gmail")[3]
+
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.add_account("Gmail", Account(username="added", password="x"))
+            store.delete_account_by_id(removed.id)
+            raise RuntimeError
+
+    assert store.get_account(removed.id) is removed
+    assert store.find_account("Gmail", "added") is None
+    assert index.search("added", 5) == []
+    assert [result.account for result in index.search(removed.username, 1)] == [removed]
+
+
+def test_set_accounts_copies_the_given_sequence(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    store.set_accounts("Gmail", [Account(username="a", password="x")])
+    store.set_accounts("Yandex", store.list_accounts("Gmail"))
+
+    store.add_account("Yandex", Account(username="b", password="x"))
+
+    assert [account.username for account in store.list_accounts("Gmail")] == ["a"]
+    assert [account.username for account in store.list_accounts("Yandex")] == ["a", "b"]
+    (original,) = store.list_accounts("Gmail")
+    copy = store.list_accounts("Yandex")[0]
+    assert copy.id != original.id
+    assert store.locate(original.id) == ("Gmail", 0)
+    assert store.locate(copy.id) == ("Yandex", 0)
+
+
+def test_adding_an_account_twice_gives_the_copy_a_new_id(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    account = Account(username="a", password="x")
+    store.add_account("Gmail", account)
+    store.add_account("Gmail", account)
+    store.set_accounts("Yandex", [account, account])
+
+    ids = [entry.id for name in ("Gmail", "Yandex") for entry in store.list_accounts(name)]
+    assert ids[0] == account.id
+    assert len(set(ids)) == 4
+    for name in ("Gmail", "Yandex"):
+        for position, entry in enumerate(store.list_accounts(name)):
+            assert store.locate(entry.id) == (name, position)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_accounts_without_ids_get_the_same_ids_on_every_load(tmp_path, lazy):
+    path = tmp_path / "vault.json"
+    accounts = [{"username": "a", "password": "x"}, {"username": "a", "password": "x"}]
+    path.write_text(json.dumps({"Gmail": {"accounts": accounts}}), encoding="utf-8")
+    journal_path = tmp_path / "vault.json.journal"
+    record = {"seq": 1, "op": "add", "service": "Gmail", "account": {"username": "b", "password": "y"}}
+    journal_path.write_text(json.dumps(record) + "\n", encoding="utf-8")
+
+    first = DataStore(path, journal=True, lazy=lazy, locking=False)
+    second = DataStore(path, journal=True, lazy=lazy, locking=False)
+    ids = [account.id for account in first.list_accounts("Gmail")]
+    assert len(set(ids)) == 3
+    assert [account.id for account in second.list_accounts("Gmail")] == ids
+
+    first.close()
+    assert [account.id for account in DataStore(path, locking=False).list_accounts("Gmail")] == ids
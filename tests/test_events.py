@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from multi_accounts_manager.data_store import Account, DataStore
+from multi_accounts_manager.events import ChangeKind
+
+
+def _record(store):
+    events = []
+    store.subscribe(events.append)
+    return events
+
+
+def test_events_carry_kind_position_and_generation(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    events = _record(store)
+    store.add_account("Gmail", Account(username="alice", password="1"))
+    store.add_account("Gmail", Account(username="bob", password="2"))
+    store.update_account("Gmail", 0, Account(username="alicia", password="1"))
+    bob = store.list_accounts("Gmail")[1]
+    store.delete_account_by_id(bob.id)
+    store.set_accounts("Yandex", [Account(username="carol", password="3")])
+
+    assert [(event.kind, event.service, event.position) for event in events] == [
+        (ChangeKind.ADDED, "Gmail", 0),
+        (ChangeKind.ADDED, "Gmail", 1),
+        (ChangeKind.UPDATED, "Gmail", 0),
+        (ChangeKind.REMOVED, "Gmail", 1),
+        (ChangeKind.RESET, "Yandex", -1),
+    ]
+    assert events[2].account.username == "alicia"
+    assert events[3].account == bob and events[3].account_id == bob.id
+    assert events[4].account is None
+    generations = [event.generation for event in events]
+    assert generations == sorted(set(generations))
+    assert events[3].generation == store.service_generation("Gmail")
+    assert events[4].generation == store.service_generation("Yandex")
+
+
+def test_batch_events_are_held_until_commit(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    events = _record(store)
+    with store.batch():
+        store.add_account("Gmail", Account(username="alice", password="1"))
+        store.add_account("Gmail", Account(username="bob", password="2"))
+        assert events == []
+    assert [(event.kind, event.position) for event in events] == [(ChangeKind.ADDED, 0), (ChangeKind.ADDED, 1)]
+
+
+def test_rolled_back_batch_publishes_nothing(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    store.add_account("Gmail", Account(username="alice", password="1"))
+    events = _record(store)
+    with pytest.raises(RuntimeError), store.batch():
+        store.add_account("Gmail", Account(username="bob", password="2"))
+        store.delete_account("Gmail", 0)
+        raise RuntimeError("abort")
+    assert events == []
+    store.add_account("Gmail", Account(username="carol", password="3"))
+    assert [(event.kind, event.position) for event in events] == [(ChangeKind.ADDED, 1)]
+
+
+def test_applying_events_in_order_reproduces_the_service(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    store.set_accounts("Gmail", [Account(username=f"user{i}", password="x") for i in range(20)])
+    copy = list(store.list_accounts("Gmail"))
+    events = _record(store)
+    rng = random.Random(0)
+    for step in range(200):
+        size = len(store.list_accounts("Gmail"))
+        action = rng.randrange(3) if size else 0
+        if action == 0:
+            store.add_account("Gmail", Account(username=f"new{step}", password="x"))
+        elif action == 1:
+            store.update_account("Gmail", rng.randrange(size), Account(username=f"edit{step}", password="y"))
+        else:
+            store.delete_account("Gmail", rng.randrange(size))
+
+    for event in events:
+        if event.kind is ChangeKind.ADDED:
+            copy.insert(event.position, event.account)
+        elif event.kind is ChangeKind.UPDATED:
+            copy[event.position] = event.account
+        elif event.kind is ChangeKind.REMOVED:
+            assert copy.pop(event.position) == event.account
+    assert copy == list(store.list_accounts("Gmail"))
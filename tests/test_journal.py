@@ -0,0 +1,21 @@
+from multi_accounts_manager.data_store import Account, DataStore
+
+
+def test_appends_after_torn_record_are_replayed(tmp_path, usernames):
+    path = tmp_path / "vault.json"
+    store = DataStore(path, journal=True)
+    store.add_account("Gmail", Account(username="a", password="x"))
+    store.close()
+
+    crashed = DataStore(path, journal=True)
+    crashed.add_account("Gmail", Account(username="b", password="x"))
+    journal_path = tmp_path / "vault.json.journal"
+    # Killed half-way through writing the record.
+    journal_path.write_bytes(journal_path.read_bytes()[:-7])
+
+    reopened = DataStore(path, journal=True)
+    assert usernames(reopened, "Gmail") == ["a"]
+    reopened.add_account("Gmail", Account(username="b", password="x"))
+    reopened.add_account("Gmail", Account(username="c", password="x"))
+
+    assert usernames(DataStore(path, journal=True), "Gmail") == ["a", "b", "c"]
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from multi_accounts_manager.binary_store import BinaryDataStore, BinarySnapshot  # noqa: E402
+from multi_accounts_manager.data_store import Account  # noqa: E402
+from multi_accounts_manager.loader import StoreLoader  # noqa: E402
+
+
+def test_a_service_that_cannot_be_decoded_fails_the_load(tmp_path):
+    path = tmp_path / "vault.mamb"
+    store = BinaryDataStore(path)
+    store.set_accounts("Gmail", [Account(username=f"user{i}", password="x") for i in range(10)])
+    store.close()
+    # Cut into the account data: the offset table still opens, decoding fails.
+    offset = BinarySnapshot(path).entries["Gmail"].offset
+    path.write_bytes(path.read_bytes()[: offset + 2])
+
+    loader = StoreLoader(str(path), ["Gmail"])
+    opened, failures = [], []
+    loader.opened.connect(opened.append)
+    loader.failed.connect(failures.append)
+    loader.indexed.connect(lambda: failures.append("indexed"))
+    loader.run()
+
+    assert len(failures) == 1 and failures[0].startswith(f"Cannot open {path}")
+    opened[0].close()
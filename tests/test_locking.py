@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from multi_accounts_manager.autosave import AutosavePolicy
+from multi_accounts_manager.data_store import Account, DataStore
+from multi_accounts_manager.locking import ReadWriteLock
+
+
+def _start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_locks_are_reentrant():
+    lock = ReadWriteLock()
+    with lock.write(), lock.write(), lock.read(), lock.read():
+        assert lock.is_writing()
+    assert not lock.is_writing()
+    with lock.read(), lock.read():
+        pass
+
+    # Both locks are free again: another thread can write.
+    acquired = threading.Event()
+
+    def write():
+        with lock.write():
+            acquired.set()
+
+    _start(write).join(1)
+    assert acquired.is_set()
+
+
+def test_upgrading_a_read_lock_raises():
+    lock = ReadWriteLock()
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with lock.write():
+        pass
+
+
+def test_waiting_writer_goes_before_new_readers():
+    lock = ReadWriteLock()
+    order = []
+    lock.acquire_read()
+
+    def write():
+        with lock.write():
+            order.append("writer")
+
+    def read():
+        with lock.read():
+            order.append("reader")
+
+    writer = _start(write)
+    while not lock._waiting_writers:
+        time.sleep(0.001)
+    reader = _start(read)
+    time.sleep(0.05)
+    assert order == []
+    lock.release_read()
+    writer.join(1)
+    reader.join(1)
+    assert order == ["writer", "reader"]
+
+
+def test_readers_never_see_a_write_in_progress():
+    lock = ReadWriteLock()
+    pair = [0, 0]
+    torn = []
+    stop = threading.Event()
+
+    def write():
+        while not stop.is_set():
+            with lock.write():
+                pair[0] += 1
+                time.sleep(0)
+                pair[1] += 1
+
+    def read():
+        while not stop.is_set():
+            with lock.read():
+                if pair[0] != pair[1]:
+                    torn.append(tuple(pair))
+
+    threads = [_start(write) for _ in range(2)] + [_start(read) for _ in range(4)]
+    time.sleep(0.3)
+    stop.set()
+    for thread in threads:
+        thread.join(1)
+    assert not torn
+    assert pair[0] == pair[1] > 0
+
+
+def test_writing_the_store_inside_a_batch_raises(tmp_path):
+    store = DataStore(tmp_path / "vault.json", journal=True)
+    with pytest.raises(RuntimeError), store.batch():
+        store.add_account("Gmail", Account(username="a", password="x"))
+        store.flush()
+    assert list(store.list_accounts("Gmail")) == []
+    store.close()
+
+
+def test_batches_and_background_flushes_do_not_deadlock(tmp_path):
+    store = DataStore(tmp_path / "vault.json", journal=True, autosave=AutosavePolicy(delay=0, max_delay=0))
+
+    def mutate(worker):
+        for step in range(50):
+            with store.batch():
+                store.add_account("Gmail", Account(username=f"{worker}-{step}", password="x"))
+
+    threads = [_start(lambda worker=worker: mutate(worker)) for worker in range(4)]
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    store.close()
+    assert len(DataStore(tmp_path / "vault.json", journal=True).list_accounts("Gmail")) == 200
@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from multi_accounts_manager.data_store import Account, DataStore  # noqa: E402
+from multi_accounts_manager.models import AccountTableModel  # noqa: E402
+from multi_accounts_manager.signals import StoreSignals  # noqa: E402
+
+
+def test_model_rows_follow_store_events(tmp_path):
+    store = DataStore(tmp_path / "vault.json")
+    store.set_accounts("Gmail", [Account(username=f"user{i}", password="x") for i in range(10)])
+    signals = StoreSignals(store)
+    model = AccountTableModel("Gmail", store, signals)
+    rng = random.Random(0)
+    for step in range(100):
+        size = len(store.list_accounts("Gmail"))
+        action = rng.randrange(4) if size else 0
+        if action == 0:
+            store.add_account("Gmail", Account(username=f"new{step}", password="x"))
+        elif action == 1:
+            store.update_account("Gmail", rng.randrange(size), Account(username=f"edit{step}", password="y"))
+        elif action == 2:
+            store.delete_account("Gmail", rng.randrange(size))
+        else:
+            with store.batch():
+                store.add_account("Gmail", Account(username=f"batch{step}", password="x"))
+                store.delete_account("Gmail", 0)
+        rows = [model.account_at(row) for row in range(model.rowCount())]
+        assert rows == list(store.list_accounts("Gmail"))
+    signals.detach()
@@ -0,0 +1,71 @@
+import multiprocessing
+import threading
+from dataclasses import replace
+
+import pytest
+
+from multi_accounts_manager.autosave import AutosavePolicy
+from multi_accounts_manager.data_store import Account, DataStore
+from multi_accounts_manager.locking import WriteConflictError
+
+PROCESSES = 3
+OPERATIONS = 20
+
+
+def _write(path, worker):
+    """Add accounts and update every other one; return what this process committed."""
+
+    store = DataStore(path, journal=True)
+    committed = {}
+    for step in range(OPERATIONS):
+        if step % 2:
+            account = store.get_account(previous.id)
+            account = replace(account, password=f"changed-{step}")
+            assert store.update_account_by_id(account.id, account)
+        else:
+            account = Account(username=f"worker{worker}-{step}", password="x")
+            store.add_account(f"Service{step % 3}", account)
+            previous = account
+        committed[account.id] = (account.username, account.password)
+    store.close()
+    return committed
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_concurrent_processes_lose_no_update(tmp_path, journal):
+    path = tmp_path / "vault.json"
+    DataStore(path, journal=journal).close()
+    with multiprocessing.get_context("fork").Pool(PROCESSES) as pool:
+        outcomes = pool.starmap(_write, [(str(path), worker) for worker in range(PROCESSES)])
+
+    expected = {account_id: state for outcome in outcomes for account_id, state in outcome.items()}
+    store = DataStore(path, journal=True)
+    actual = {
+        account.id: (account.username, account.password)
+        for service in store.all_services().values()
+        for account in service.accounts
+    }
+    store.close()
+    assert len(expected) == PROCESSES * OPERATIONS // 2
+    assert actual == expected
+
+
+def test_background_conflicts_reach_conflict_listeners(tmp_path):
+    path = tmp_path / "vault.json"
+    first = DataStore(path)
+    first.add_account("Gmail", Account(username="alice", password="1"))
+    account = first.list_accounts("Gmail")[0]
+
+    second = DataStore(path, autosave=AutosavePolicy(delay=0, max_delay=0))
+    conflicts = []
+    reported = threading.Event()
+    second.subscribe_conflicts(lambda error: (conflicts.append(error), reported.set()))
+
+    first.delete_account_by_id(account.id)
+    second.update_account_by_id(account.id, Account(username="alice", password="2"))
+    assert reported.wait(5)
+    (error,) = conflicts
+    assert isinstance(error, WriteConflictError)
+    assert [record["op"] for record in error.rejected] == ["update"]
+    second.close()
+    first.close()
@@ -0,0 +1,17 @@
+from multi_accounts_manager.data_store import Account, ServiceData
+from multi_accounts_manager.search import TrigramIndex
+
+
+def test_service_name_matches_are_ranked_without_the_whole_service():
+    gmail = [Account(username=f"user{i:04}", password="x") for i in range(1000)]
+    index = TrigramIndex()
+    index.rebuild({"Gmail": ServiceData("Gmail", gmail), "Yandex": ServiceData("Yandex", [])})
+    shortest = Account(username="ab", password="x")
+    index.add("Gmail", shortest)
+    index.remove("Gmail", gmail[0])
+
+    results = index.search("gmail", 3)
+
+    assert [result.account for result in results] == [shortest, gmail[1], gmail[2]]
+    assert {result.score for result in results} == {1.0}
+    assert len(index.search("gmail", None)) == 1000
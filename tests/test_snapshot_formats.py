@@ -0,0 +1,60 @@
+import pytest
+
+from multi_accounts_manager.binary_store import BinaryDataStore, binary_to_json, json_to_binary
+from multi_accounts_manager.data_store import Account, DataStore
+from multi_accounts_manager.sharded_store import ShardedDataStore
+
+
+@pytest.mark.parametrize(
+    ("store_class", "file_name"), [(BinaryDataStore, "vault.mamb"), (ShardedDataStore, "vault.shards")]
+)
+def test_replayed_journal_survives_checkpoint(tmp_path, usernames, store_class, file_name):
+    path = tmp_path / file_name
+    store = store_class(path, journal=True)
+    store.add_account("Gmail", Account(username="a", password="x"))
+    store.close()
+
+    # Journaled but never checkpointed, as if the process had been killed.
+    crashed = store_class(path, journal=True)
+    crashed.add_account("Gmail", Account(username="b", password="x"))
+
+    replayed = store_class(path, journal=True)
+    assert usernames(replayed, "Gmail") == ["a", "b"]
+    replayed.close()
+
+    assert usernames(store_class(path, journal=True), "Gmail") == ["a", "b"]
+
+
+def _populate(store):
+    store.set_accounts("Gmail", [Account(username="alice", password="1"), Account(username="bob", password="2")])
+    store.set_accounts("Yandex", [Account(username="ünïcode", password="päss\nword")])
+    store.set_accounts("Empty", [])
+
+
+def test_json_to_binary_round_trip(tmp_path):
+    json_path = tmp_path / "vault.json"
+    source = DataStore(json_path, locking=False)
+    _populate(source)
+    expected = source.copy_accounts()
+    source.close()
+
+    json_to_binary(json_path, tmp_path / "vault.mamb")
+    assert BinaryDataStore(tmp_path / "vault.mamb").copy_accounts() == expected
+    assert not (tmp_path / "vault.json.lock").exists()
+
+    binary_to_json(tmp_path / "vault.mamb", tmp_path / "copy.json")
+    assert DataStore(tmp_path / "copy.json").copy_accounts() == expected
+    assert not any(path.suffix == ".tmp" for path in tmp_path.iterdir())
+
+
+def test_binary_to_json_replaces_an_existing_file(tmp_path):
+    binary_path = tmp_path / "vault.mamb"
+    source = BinaryDataStore(binary_path)
+    _populate(source)
+    expected = source.copy_accounts()
+    source.close()
+
+    json_path = tmp_path / "vault.json"
+    json_path.write_text("stale", encoding="utf-8")
+    binary_to_json(binary_path, json_path)
+    assert DataStore(json_path).copy_accounts() == expected
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from multi_accounts_manager.data_store import Account, DataStore, DuplicateAccountError
+from multi_accounts_manager.events import ChangeKind
+from multi_accounts_manager.sqlite_store import SqliteDataStore
+
+
+def test_migration_imports_snapshot_and_journal(tmp_path, usernames):
+    json_path = tmp_path / "vault.json"
+    # Not closed, so the last addition is only in the journal.
+    source = DataStore(json_path, journal=True, locking=False)
+    source.set_accounts("Gmail", [Account(username="alice", password="1"), Account(username="bob", password="2")])
+    source.save()
+    source.add_account("Gmail", Account(username="carol", password="3"))
+    source.flush()
+    assert source.has_pending_journal()
+    ids = [account.id for account in source.list_accounts("Gmail")]
+
+    store = SqliteDataStore(tmp_path / "vault.db", migrate_from=json_path)
+    assert usernames(store, "Gmail") == ["alice", "bob", "carol"]
+    assert [account.id for account in store.list_accounts("Gmail")] == ids
+    assert not (tmp_path / "vault.json.lock").exists()
+    assert not store.migrate_json(json_path)
+    store.close()
+
+
+def test_migration_gives_accounts_without_ids_unique_ids(tmp_path):
+    json_path = tmp_path / "vault.json"
+    accounts = [{"username": f"user{i}", "password": "x"} for i in range(3)]
+    json_path.write_text(json.dumps({"Gmail": {"accounts": accounts}}), encoding="utf-8")
+
+    store = SqliteDataStore(tmp_path / "vault.db", migrate_from=json_path)
+    migrated = store.list_accounts("Gmail")
+    assert [account.username for account in migrated] == ["user0", "user1", "user2"]
+    assert len({account.id for account in migrated}) == 3
+    assert all(store.get_account(account.id) == account for account in migrated)
+    store.close()
+
+
+def test_unique_usernames_ignore_ascii_case(tmp_path, usernames):
+    store = SqliteDataStore(tmp_path / "vault.db", unique_usernames=True)
+    store.add_account("Gmail", Account(username="bob", password="1"))
+    with pytest.raises(DuplicateAccountError):
+        store.add_account("Gmail", Account(username="BOB", password="2"))
+    with pytest.raises(DuplicateAccountError):
+        store.set_accounts("Gmail", [Account(username="q", password="1"), Account(username="Q", password="2")])
+    assert usernames(store, "Gmail") == ["bob"]
+    store.add_account("Yandex", Account(username="BOB", password="3"))
+    store.close()
+
+
+def test_events_carry_positions_and_generations(tmp_path):
+    store = SqliteDataStore(tmp_path / "vault.db")
+    events = []
+    store.subscribe(events.append)
+    store.add_account("Gmail", Account(username="alice", password="1"))
+    store.add_account("Gmail", Account(username="bob", password="2"))
+    store.update_account("Gmail", 1, Account(username="bobby", password="2"))
+    store.delete_account("Gmail", 0)
+
+    assert [(event.kind, event.position) for event in events] == [
+        (ChangeKind.ADDED, 0),
+        (ChangeKind.ADDED, 1),
+        (ChangeKind.UPDATED, 1),
+        (ChangeKind.REMOVED, 0),
+    ]
+    assert events[2].account.username == "bobby"
+    generations = [event.generation for event in events]
+    assert generations == sorted(set(generations))
+    assert generations[-1] == store.service_generation("Gmail")
+    store.close()
+
+
+def test_failed_batch_rolls_back_rows_and_events(tmp_path, usernames):
+    store = SqliteDataStore(tmp_path / "vault.db")
+    store.add_account("Gmail", Account(username="alice", password="1"))
+    events = []
+    store.subscribe(events.append)
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.add_account("Gmail", Account(username="bob", password="2"))
+            store.delete_account("Gmail", 0)
+            raise RuntimeError("abort")
+    assert usernames(store, "Gmail") == ["alice"]
+    assert events == []
+    store.close()
+
+
+def test_copied_accounts_get_their_own_ids(tmp_path):
+    store = SqliteDataStore(tmp_path / "vault.db")
+    account = Account(username="a", password="x")
+    store.add_account("Gmail", account)
+    store.add_account("Gmail", account)
+    store.set_accounts("Yandex", store.list_accounts("Gmail"))
+
+    ids = [entry.id for name in ("Gmail", "Yandex") for entry in store.list_accounts(name)]
+    assert ids[0] == account.id
+    assert len(set(ids)) == 4
+    store.close()
@@ -0,0 +1,31 @@
+import json
+
+from multi_accounts_manager.autosave import AutosavePolicy
+from multi_accounts_manager.data_store import Account, DataStore
+from multi_accounts_manager.watcher import WatchPolicy
+
+
+def test_pending_edits_are_merged_with_an_unlocked_external_edit(tmp_path, usernames):
+    path = tmp_path / "vault.json"
+    seed = DataStore(path)
+    seed.add_account("Twitter", Account(username="old", password="x"))
+    seed.close()
+    store = DataStore(
+        path,
+        autosave=AutosavePolicy(delay=3600, max_delay=3600),
+        watch=WatchPolicy(interval=3600, use_inotify=False),
+    )
+    store.add_account("Gmail", Account(username="mine", password="x"))
+
+    # A sync tool or editor rewrites the file without taking the store lock.
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    payload["Twitter"]["accounts"][0]["username"] = "theirs"
+    path.write_text(json.dumps(payload), encoding="utf-8")
+    store.flush()
+
+    assert usernames(store, "Twitter") == ["theirs"]
+    assert usernames(store, "Gmail") == ["mine"]
+    store.close()
+    reopened = DataStore(path)
+    assert usernames(reopened, "Twitter") == ["theirs"]
+    assert usernames(reopened, "Gmail") == ["mine"]